@@ -96,6 +96,21 @@ def run_migrations_online():
 
     connectable = get_engine()
 
+    # search objects that only exist on one dialect (see api/search.py): the
+    # Postgres tsvector column and its GIN index, and SQLite's FTS5 tables
+    def include_object(obj, name, type_, reflected, compare_to):
+        if type_ == "table" and name and name.startswith("story_fts"):
+            return False
+        if connectable.dialect.name != "postgresql":
+            if type_ == "column" and obj.info.get("postgresql_only"):
+                return False
+            if type_ == "index" and name == "ix_story_search_vector":
+                return False
+        return True
+
+    if conf_args.get("include_object") is None:
+        conf_args["include_object"] = include_object
+
     with connectable.connect() as connection:
         context.configure(
             connection=connection,
@@ -0,0 +1,55 @@
+"""empty message
+
+Revision ID: 3b9c1d7e5a20
+Revises: 6daee1877dbd
+Create Date: 2026-10-18 12:05:41.218334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b9c1d7e5a20'
+down_revision = '6daee1877dbd'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Story full-text search: generated tsvector + GIN on Postgres, FTS5 table + triggers on SQLite
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "ALTER TABLE story ADD COLUMN search_vector tsvector GENERATED ALWAYS AS "
+            "(to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(synopsis, ''))) STORED"
+        )
+        op.execute("CREATE INDEX ix_story_search_vector ON story USING GIN (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS story_fts USING fts5(title, synopsis)")
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS story_fts_ai AFTER INSERT ON story BEGIN "
+            "INSERT INTO story_fts(rowid, title, synopsis) VALUES (new.id, new.title, new.synopsis); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS story_fts_au AFTER UPDATE OF title, synopsis ON story BEGIN "
+            "DELETE FROM story_fts WHERE rowid = old.id; "
+            "INSERT INTO story_fts(rowid, title, synopsis) VALUES (new.id, new.title, new.synopsis); END"
+        )
+        op.execute(
+            "CREATE TRIGGER IF NOT EXISTS story_fts_ad AFTER DELETE ON story BEGIN "
+            "DELETE FROM story_fts WHERE rowid = old.id; END"
+        )
+        op.execute("INSERT INTO story_fts(rowid, title, synopsis) SELECT id, title, synopsis FROM story")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_story_search_vector")
+        op.execute("ALTER TABLE story DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS story_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS story_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS story_fts_ai")
+        op.execute("DROP TABLE IF EXISTS story_fts")
@@ -0,0 +1,126 @@
+"""
+In-memory manifest of the built front-end in dist/.
+
+The manifest is built once at startup instead of stat()-ing the disk on every
+request. Content-hashed build outputs (vite's assets/<name>-<hash>.<ext>) are
+served with a one-year immutable Cache-Control; everything else gets an ETag
+and a short max-age. Precompressed .br / .gz siblings produced by the build are
+served when the client accepts them, and small text assets without one are
+gzipped once in memory. index.html is kept in memory, re-read at most every
+INDEX_TTL seconds, and a changed index.html (a new deploy) rebuilds the manifest.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+import time
+
+from flask import current_app, request, send_file
+
+# the hash is base64url (may contain "-" and "_") and is the last segment before the extension
+_HASHED_RE = re.compile(r"(^|/)assets/[^/]+?[-.][A-Za-z0-9_-]{8,}\.[a-z0-9]+$")
+_COMPRESSIBLE = {".js", ".mjs", ".css", ".html", ".svg", ".json", ".txt", ".map", ".xml", ".ico"}
+_ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+INLINE_LIMIT = 512 * 1024
+INDEX_TTL = 30
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+SHORT = "public, max-age=3600"
+
+
+class Asset:
+    def __init__(self, path, rel):
+        self.path = path
+        self.mimetype = mimetypes.guess_type(rel)[0] or "application/octet-stream"
+        self.immutable = bool(_HASHED_RE.search(rel))
+        size = os.path.getsize(path)
+        with open(path, "rb") as fh:
+            data = fh.read()
+        self.etag = hashlib.sha1(data).hexdigest()[:20]
+        self.body = data if size <= INLINE_LIMIT else None
+        self.variants = {}
+        for encoding, suffix in _ENCODING_SUFFIX.items():
+            if os.path.isfile(path + suffix):
+                with open(path + suffix, "rb") as fh:
+                    self.variants[encoding] = fh.read()
+        if ("gzip" not in self.variants and self.body is not None and len(data) > 1024
+                and os.path.splitext(rel)[1] in _COMPRESSIBLE):
+            self.variants["gzip"] = gzip.compress(data, compresslevel=9)
+
+
+class AssetManifest:
+    def __init__(self, root):
+        self.root = os.path.realpath(root)
+        self._lock = threading.Lock()
+        self._assets = {}
+        self._index_checked = 0.0
+        self._index_mtime = None
+        self.build()
+
+    def build(self):
+        assets = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if name.endswith((".br", ".gz")):
+                    continue
+                path = os.path.join(dirpath, name)
+                rel = os.path.relpath(path, self.root).replace(os.sep, "/")
+                assets[rel] = Asset(path, rel)
+        index = os.path.join(self.root, "index.html")
+        with self._lock:
+            self._assets = assets
+            self._index_mtime = os.path.getmtime(index) if os.path.isfile(index) else None
+            self._index_checked = time.monotonic()
+
+    def _refresh_index(self):
+        if time.monotonic() - self._index_checked < INDEX_TTL:
+            return
+        index = os.path.join(self.root, "index.html")
+        mtime = os.path.getmtime(index) if os.path.isfile(index) else None
+        if mtime != self._index_mtime:
+            self.build()
+        else:
+            self._index_checked = time.monotonic()
+
+    def get(self, rel):
+        return self._assets.get(rel)
+
+    def serve(self, rel):
+        """Serves `rel` from dist/, falling back to index.html for client-side routes."""
+        self._refresh_index()
+        asset = self.get(rel)
+        if asset is None:
+            rel = "index.html"
+            asset = self.get(rel)
+        if asset is None:
+            return current_app.response_class("Not Found", status=404)
+
+        if rel == "index.html":
+            cache_control = REVALIDATE
+        elif asset.immutable:
+            cache_control = IMMUTABLE
+        else:
+            cache_control = SHORT
+
+        encoding = None
+        for candidate in ("br", "gzip"):
+            if candidate in asset.variants and request.accept_encodings[candidate]:
+                encoding = candidate
+                break
+
+        if encoding is not None:
+            response = current_app.response_class(asset.variants[encoding], mimetype=asset.mimetype)
+            response.headers["Content-Encoding"] = encoding
+            response.set_etag(f"{asset.etag}-{encoding}")
+        elif asset.body is not None:
+            response = current_app.response_class(asset.body, mimetype=asset.mimetype)
+            response.set_etag(asset.etag)
+        else:
+            response = send_file(asset.path, mimetype=asset.mimetype, etag=asset.etag, conditional=False)
+        if asset.variants:
+            response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = cache_control
+        return response.make_conditional(request)
@@ -0,0 +1,253 @@
+"""
+ASGI application for the public read endpoints.
+
+GET requests for the story list, a story, its similar stories, chapters and
+comments, a published chapter and the follow list are answered by coroutines
+that run the statements from api/reads.py on SQLAlchemy's async engine
+(asyncpg on Postgres, aiosqlite on SQLite), so a worker keeps serving other
+requests while one waits on the database. Each request runs inside a Flask
+request context and goes through the app's before_request hooks, JSON
+provider and after_request hooks, so bodies, headers (Server-Timing) and
+/internal/metrics match the WSGI views. Everything else (writes,
+authenticated routes, draft chapters, static files) is handed to the Flask app
+through asgiref's WSGI adapter.
+
+Served by src/asgi.py, e.g. `uvicorn asgi:application --app-dir src`.
+"""
+import io
+import os
+import re
+import sys
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import jsonify, request
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from api.loaders import story_options
+from api.models import Story, Chapter, ChapterStatus
+from api.reads import (
+    story_list_args, filter_stories, order_stories, story_list_body, story_totals, totals_key,
+    chapters_stmt, chapter_stmt, comments_stmt, chapter_comments_stmt,
+    follow_list_args, follows_stmt, follows_body, similar_stmt, similar_body, fields_arg,
+    comment_list_args, comments_body,
+)
+from api.similar import SIMILAR_TOP_K
+from api.timefmt import request_formatter
+
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+_POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout", "pool_recycle", "pool_pre_ping")
+
+
+def async_engine_from_config(config):
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    backend = url.get_backend_name()
+    url = url.set(drivername=_ASYNC_DRIVERS[backend])
+    options = {}
+    if backend == "postgresql":
+        sync_options = config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        options = {k: sync_options[k] for k in _POOL_OPTIONS if k in sync_options}
+        connect_args = {}
+        if "sslmode" in url.query:
+            connect_args["ssl"] = url.query["sslmode"]
+            url = url.difference_update_query(["sslmode"])
+        timeout_ms = os.getenv("DB_STATEMENT_TIMEOUT_MS")
+        if timeout_ms:
+            connect_args["server_settings"] = {"statement_timeout": timeout_ms}
+        if connect_args:
+            options["connect_args"] = connect_args
+    return create_async_engine(url, **options)
+
+
+async def _count(session, q):
+    return await session.scalar(select(func.count()).select_from(q.order_by(None).subquery()))
+
+
+async def list_stories(session):
+    fmt = request_formatter(request)
+    params, error = story_list_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    q, relevance = filter_stories(select(Story).options(*story_options("story_card", params["fields"])), params)
+
+    total = None
+    if params["total_mode"] == "cached":
+        key = totals_key(params)
+        total = story_totals.get(key)
+        if total is None:
+            total = await _count(session, q)
+            story_totals.set(key, total)
+    elif params["total_mode"] == "exact":
+        total = await _count(session, q)
+
+    list_order = order_stories(q, params, relevance)
+    per_page = params["per_page"]
+    has_more = False
+    if params["cursor_mode"]:
+        items = (await session.scalars(list_order.limit(per_page + 1))).all()
+        has_more = len(items) > per_page
+        items = items[:per_page]
+    else:
+        offset = (params["page"] - 1) * per_page
+        items = (await session.scalars(list_order.limit(per_page).offset(offset))).all()
+
+    return jsonify(story_list_body(params, items, fmt, total, has_more))
+
+
+async def get_story(session, story_id):
+    fmt = request_formatter(request)
+    fields, error = fields_arg(request.args, Story)
+    if error:
+        return jsonify({"error": error}), 400
+    story = await session.get(Story, story_id, options=story_options("story_detail", fields))
+    if not story:
+        return jsonify({"error": "not_found"}), 404
+    return jsonify(story.serialize(fmt=fmt, fields=fields))
+
+
+async def similar_stories(session, story_id):
+    fmt = request_formatter(request)
+    limit = min(max(request.args.get("limit", 10, type=int), 1), SIMILAR_TOP_K)
+    fields, error = fields_arg(request.args, Story)
+    if error:
+        return jsonify({"error": error}), 400
+    rows = (await session.execute(similar_stmt(story_id, limit, fields))).all()
+    if not rows and await session.get(Story, story_id) is None:
+        return jsonify({"error": "not_found"}), 404
+    return jsonify(similar_body(rows, fmt, fields))
+
+
+async def list_chapters(session, story_id):
+    fmt = request_formatter(request)
+    fields, error = fields_arg(request.args, Chapter, Chapter.TOC_FIELDS)
+    if error:
+        return jsonify({"error": error}), 400
+    items = (await session.scalars(chapters_stmt(story_id, fields))).all()
+    return jsonify([c.serialize_toc(fmt=fmt, fields=fields) for c in items])
+
+
+async def get_chapter(session, story_id, chapter_id):
+    fmt = request_formatter(request)
+    fields, error = fields_arg(request.args, Chapter)
+    if error:
+        return jsonify({"error": error}), 400
+    c = (await session.scalars(chapter_stmt(story_id, chapter_id, fields))).first()
+    if not c or c.deleted_at is not None:
+        return jsonify({"error": "not_found"}), 404
+    if c.status != ChapterStatus.PUBLISHED:
+        return None  # drafts need the caller's identity, the sync view checks it
+    return jsonify(c.serialize(fmt=fmt, fields=fields)), 200
+
+
+async def list_comments(session):
+    fmt = request_formatter(request)
+    params, error = comment_list_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    items = (await session.scalars(comments_stmt(params, request.args.get("story_id", type=int)))).all()
+    return jsonify(comments_body(params, items, fmt))
+
+
+async def list_chapter_comments(session, story_id, chapter_id):
+    fmt = request_formatter(request)
+    params, error = comment_list_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    items = (await session.scalars(chapter_comments_stmt(story_id, chapter_id, params))).all()
+    return jsonify(comments_body(params, items, fmt)), 200
+
+
+async def list_follows(session):
+    params, error = follow_list_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    items = (await session.scalars(follows_stmt(params))).all()
+    return jsonify(follows_body(params, items)), 200
+
+
+ROUTES = [
+    (re.compile(r"^/api/stories/?$"), list_stories),
+    (re.compile(r"^/api/stories/(?P<story_id>\d+)/?$"), get_story),
+    (re.compile(r"^/api/stories/(?P<story_id>\d+)/similar/?$"), similar_stories),
+    (re.compile(r"^/api/stories/(?P<story_id>\d+)/chapters/?$"), list_chapters),
+    (re.compile(r"^/api/stories/(?P<story_id>\d+)/chapters/(?P<chapter_id>\d+)/?$"), get_chapter),
+    (re.compile(r"^/api/stories/(?P<story_id>\d+)/chapters/(?P<chapter_id>\d+)/comments/?$"), list_chapter_comments),
+    (re.compile(r"^/api/comments/?$"), list_comments),
+    (re.compile(r"^/api/follows/?$"), list_follows),
+]
+
+
+def _environ(scope):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope["query_string"].decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(),
+        "wsgi.errors": sys.stderr,
+    }
+    for name, value in scope["headers"]:
+        name = name.decode("latin1").upper().replace("-", "_")
+        key = name if name in ("CONTENT_TYPE", "CONTENT_LENGTH") else "HTTP_" + name
+        value = value.decode("latin1")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class AsyncReadApp:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.fallback = WsgiToAsgi(flask_app)
+        self.engine = async_engine_from_config(flask_app.config)
+        self.sessions = async_sessionmaker(self.engine, expire_on_commit=False)
+
+    def match(self, path):
+        for pattern, handler in ROUTES:
+            m = pattern.match(path)
+            if m:
+                return handler, {k: int(v) for k, v in m.groupdict().items()}
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] == "GET":
+            handler, kwargs = self.match(scope["path"])
+            if handler is not None and await self._handle(handler, kwargs, scope, send):
+                return
+        await self.fallback(scope, receive, send)
+
+    async def _handle(self, handler, kwargs, scope, send):
+        with self.flask_app.request_context(_environ(scope)):
+            # same hooks as Flask's full_dispatch_request: SQL stats and metrics start here
+            rv = self.flask_app.preprocess_request()
+            if rv is None:
+                async with self.sessions() as session:
+                    rv = await handler(session, **kwargs)
+                if rv is None:
+                    return False
+            response = self.flask_app.process_response(self.flask_app.make_response(rv))
+            body = response.get_data()
+            headers = [(k.lower().encode("latin1"), v.encode("latin1")) for k, v in response.headers.items()]
+        await send({"type": "http.response.start", "status": response.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+        return True
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
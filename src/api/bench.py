@@ -0,0 +1,543 @@
+"""
+Endpoint benchmark used by `flask bench`.
+
+Drives every route of the `api` blueprint through the Flask test client
+against the configured database (seed it first with `flask insert-test-data`;
+write scenarios add rows, so use a disposable database). For each scenario it
+reports p50/p95 latency, SQL statements, ORM rows loaded and response bytes
+per request, and fails when a request exceeds its statement, latency or size
+budget, returns an unexpected status, or when a paged listing issues more
+statements for a big page than for a small one (an N+1). A second fixture
+author follows the bench user and owns a published story, so follow scenarios
+and the publish fan-out work on an empty database too. The response cache is
+bypassed so the numbers reflect the uncached path. A long story fixture also
+compares the chapter table of contents with the full-content listing it
+replaced (compare_chapter_listing).
+
+compare_serving() (`flask bench-serving`) starts the WSGI app under gunicorn
+sync workers and the ASGI app (src/asgi.py) under uvicorn with the same number
+of worker processes, drives both with the same concurrent read traffic and
+reports throughput and latency, i.e. the concurrency the async path gains.
+"""
+import itertools
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.client import HTTPConnection
+
+from flask import request
+from sqlalchemy import insert, select
+from sqlalchemy.orm import undefer
+
+from api.cache import result_cache
+from api.follows import follow_user
+from api.models import db, User, UserRole, Story, StoryStatus, Chapter, ChapterStatus, Comment, Category
+from api.pagination import encode_cursor
+from api.sqlstats import count_queries
+from api.timefmt import request_formatter
+
+# unique names and numbers for rows the write scenarios create, also across runs on one database
+_seq = itertools.count(int(time.time()) % 10**8)
+
+READ_P95_MS = 100
+WRITE_P95_MS = 150
+LONG_STORY_CHAPTERS = 300
+LONG_CHAPTER_CHARS = 600  # chapter.content is VARCHAR(600)
+LONG_THREAD_COMMENTS = 400
+
+
+class Scenario:
+    def __init__(self, name, method, url, json=None, auth=False, status=200,
+                 queries=None, p95_ms=READ_P95_MS, setup=None, scale=None, max_bytes=None):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.json = json
+        self.auth = auth
+        self.status = status
+        self.queries = queries
+        self.p95_ms = p95_ms
+        self.setup = setup
+        self.scale = scale  # (query arg, small value, large value) for the N+1 check
+        self.max_bytes = max_bytes
+
+
+def _percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+class BenchContext:
+    def __init__(self, client):
+        self.client = client
+        self.token = None
+        self.values = {}
+
+    def request(self, method, url, json=None, auth=False):
+        headers = {"Authorization": f"Bearer {self.token}"} if auth else {}
+        return self.client.open(url, method=method, json=json, headers=headers)
+
+    def _user(self, email, display_name):
+        user = User.query.filter_by(email=email).first()
+        if user is None:
+            user = User(email=email, password="bench", display_name=display_name)
+            db.session.add(user)
+        return user
+
+    def setup_fixtures(self):
+        email = "bench@example.com"
+        user = self._user(email, "bench-runner")
+        user.user_role = UserRole.ADMIN
+        author = self._user("bench-author@example.com", "bench-author")
+        category = Category.query.filter_by(slug="bench").first()
+        if category is None:
+            category = Category(name="Bench", slug="bench")
+            db.session.add(category)
+        db.session.commit()
+        # a follower for the publish fan-out of update_story_publish
+        follow_user(author.id, user.id)
+        db.session.commit()
+        self.token = self.request("POST", "/api/auth/login", {"email": email, "password": "bench"}).get_json()["access_token"]
+
+        own = self.request("POST", "/api/stories", {"title": "Bench story", "synopsis": "bench", "tags": ["bench"]}, auth=True).get_json()
+        self.request("PATCH", f"/api/stories/{own['id']}", {"status": "PUBLISHED"}, auth=True)
+        chapter = self.request("POST", f"/api/stories/{own['id']}/chapters",
+                               {"title": "Bench 1", "number": 1, "content": "bench", "status": "PUBLISHED"}, auth=True).get_json()
+
+        hot = (Story.query.filter_by(status=StoryStatus.PUBLISHED)
+               .order_by(Story.views_count.desc(), Story.id.asc()).first())
+        hot_chapter = (Chapter.query.filter_by(story_id=hot.id, status=ChapterStatus.PUBLISHED)
+                       .filter(Chapter.deleted_at.is_(None)).order_by(Chapter.number.asc()).first())
+        if hot_chapter is None or hot.author_id == user.id:
+            hot, hot_chapter = self._author_story(author)
+        tag = hot.tags[0].slug if hot.tags else "bench"
+
+        long_story = self._long_story(user)
+        thread_anchor = self._long_thread(user, long_story)
+
+        self.values = {
+            "long_story": long_story.id,
+            "long_chapter": long_story.chapters[0].id,
+            "comment_cursor": encode_cursor({"id": thread_anchor}),
+            "me": user.id,
+            "own_story": own["id"],
+            "own_chapter": chapter["id"],
+            "story": hot.id,
+            "chapter": hot_chapter.id,
+            "author": hot.author_id,
+            "category": category.id,
+            "tag": tag,
+        }
+
+    def _author_story(self, author):
+        """A published story with one chapter by the second fixture author, created once per database."""
+        story = Story.query.filter_by(author_id=author.id, title="Bench author story").first()
+        if story is None:
+            now = datetime.now(timezone.utc)
+            story = Story(author_id=author.id, title="Bench author story", synopsis="bench",
+                          status=StoryStatus.PUBLISHED, published_at=now)
+            db.session.add(story)
+            db.session.flush()
+            db.session.add(Chapter(story_id=story.id, title="Chapter 1", number=1, content="bench",
+                                   status=ChapterStatus.PUBLISHED, published_at=now))
+            db.session.commit()
+        return story, story.chapters[0]
+
+
+    def _long_story(self, user):
+        """A published story with LONG_STORY_CHAPTERS full-length chapters, created once per database."""
+        story = Story.query.filter_by(author_id=user.id, title="Bench long story").first()
+        if story is None:
+            now = datetime.now(timezone.utc)
+            story = Story(author_id=user.id, title="Bench long story", synopsis="bench",
+                          status=StoryStatus.PUBLISHED, published_at=now)
+            db.session.add(story)
+            db.session.flush()
+            text = ("lorem ipsum dolor sit amet " * 30)[:LONG_CHAPTER_CHARS]
+            db.session.execute(insert(Chapter), [
+                {"story_id": story.id, "title": f"Chapter {n}", "number": n, "content": text,
+                 "status": ChapterStatus.PUBLISHED, "published_at": now}
+                for n in range(1, LONG_STORY_CHAPTERS + 1)
+            ])
+            db.session.commit()
+        return story
+
+    def _long_thread(self, user, story):
+        """LONG_THREAD_COMMENTS comments on the long story's first chapter; returns a mid-thread comment id.
+
+        Pairs of comments share a timestamp so the (created_at, id) tiebreak is exercised, and every
+        tenth one is soft-deleted so listings have rows to skip.
+        """
+        chapter = story.chapters[0]
+        if not Comment.query.filter_by(story_id=story.id, chapter_id=chapter.id).limit(1).count():
+            now = datetime.now(timezone.utc)
+            db.session.execute(insert(Comment), [
+                {"user_id": user.id, "story_id": story.id, "chapter_id": chapter.id, "text": f"comment {n}",
+                 "created_at": now - timedelta(seconds=n // 2),
+                 "deleted_at": now if n % 10 == 0 else None}
+                for n in range(LONG_THREAD_COMMENTS)
+            ])
+            db.session.commit()
+        return db.session.scalar(
+            select(Comment.id).filter_by(story_id=story.id, chapter_id=chapter.id)
+            .where(Comment.deleted_at.is_(None))
+            .order_by(Comment.created_at.desc(), Comment.id.desc())
+            .offset(LONG_THREAD_COMMENTS // 4).limit(1)
+        )
+
+
+def compare_chapter_listing(app, ctx, iterations, log=print):
+    """Table-of-contents list_chapters against the full-content listing it replaced, on the long story."""
+    story_id = ctx.values["long_story"]
+    toc_ms, toc_bytes = [], 0
+    full_ms, full_bytes = [], 0
+    full_stmt = (select(Chapter).options(undefer(Chapter.content))
+                 .filter_by(story_id=story_id).filter(Chapter.deleted_at.is_(None))
+                 .order_by(Chapter.number.asc()))
+    for i in range(iterations + 2):
+        started = time.perf_counter()
+        toc_bytes = len(ctx.request("GET", f"/api/stories/{story_id}/chapters").get_data())
+        toc = (time.perf_counter() - started) * 1000
+
+        with app.test_request_context(f"/api/stories/{story_id}/chapters"):
+            started = time.perf_counter()
+            fmt = request_formatter(request)
+            items = db.session.scalars(full_stmt).all()
+            full_bytes = len(app.json.response([c.serialize(fmt=fmt) for c in items]).get_data())
+            full = (time.perf_counter() - started) * 1000
+        if i >= 2:
+            toc_ms.append(toc)
+            full_ms.append(full)
+
+    result = {
+        "name": "list_chapters_long_vs_full",
+        "chapters": LONG_STORY_CHAPTERS,
+        "toc_bytes": toc_bytes,
+        "full_bytes": full_bytes,
+        "toc_p50_ms": round(_percentile(toc_ms, 50), 2),
+        "full_p50_ms": round(_percentile(full_ms, 50), 2),
+    }
+    log(f"list_chapters on {LONG_STORY_CHAPTERS} chapters: toc {toc_bytes} bytes p50 {result['toc_p50_ms']}ms, "
+        f"full content {full_bytes} bytes p50 {result['full_p50_ms']}ms (in-process, no HTTP)")
+    return result
+
+
+def _new_chapter(ctx):
+    c = ctx.request("POST", f"/api/stories/{ctx.values['own_story']}/chapters",
+                    {"title": "tmp", "number": 1000 + next(_seq), "content": "tmp"}, auth=True).get_json()
+    return {"target": c["id"]}
+
+
+def _new_comment(ctx):
+    c = ctx.request("POST", "/api/comments", {"story_id": ctx.values["story"], "text": "tmp"}, auth=True).get_json()
+    return {"target": c["id"]}
+
+
+def _new_draft(ctx):
+    s = ctx.request("POST", "/api/stories", {"title": "Bench draft", "synopsis": "bench"}, auth=True).get_json()
+    return {"target": s["id"], "n": next(_seq)}
+
+
+def _not_following(ctx):
+    ctx.request("DELETE", f"/api/follows?following_id={ctx.values['author']}", auth=True)
+    return {}
+
+
+def _following(ctx):
+    ctx.request("POST", "/api/follows", {"following_id": ctx.values["author"]}, auth=True)
+    return {}
+
+
+def _fresh(ctx):
+    return {"n": next(_seq)}
+
+
+def scenarios():
+    W = WRITE_P95_MS
+    return [
+        Scenario("hello", "GET", "/api/hello", queries=0),
+        Scenario("list_categories", "GET", "/api/categories", queries=1),
+        Scenario("list_tags", "GET", "/api/tags?q=a", queries=1),
+        Scenario("list_stories", "GET", "/api/stories?per_page={per_page}", queries=4, scale=("per_page", 5, 50)),
+        Scenario("list_stories_tag", "GET", "/api/stories?tag={tag}&per_page={per_page}", queries=4, scale=("per_page", 5, 50)),
+        Scenario("list_stories_search", "GET", "/api/stories?q=dragon&per_page={per_page}", queries=5, scale=("per_page", 5, 50)),
+        Scenario("list_stories_trending", "GET", "/api/stories?sort=trending&cursor=&per_page={per_page}", queries=3,
+                 scale=("per_page", 5, 50)),
+        Scenario("list_stories_cursor", "GET", "/api/stories?cursor=&per_page={per_page}", queries=3, scale=("per_page", 5, 50)),
+        # ?fields= without category/tags skips both relationship loads
+        Scenario("list_stories_fields", "GET", "/api/stories?fields=id,title&cursor=&per_page={per_page}", queries=1,
+                 scale=("per_page", 5, 50), max_bytes=50 * 80),
+        Scenario("get_story", "GET", "/api/stories/{story}", queries=2),
+        Scenario("similar_stories", "GET", "/api/stories/{story}/similar?limit={limit}", queries=3,
+                 scale=("limit", 5, 20)),
+        Scenario("list_chapters", "GET", "/api/stories/{story}/chapters", queries=1),
+        Scenario("get_chapter", "GET", "/api/stories/{story}/chapters/{chapter}", queries=1),
+        Scenario("list_chapters_long", "GET", "/api/stories/{long_story}/chapters", queries=1,
+                 max_bytes=LONG_STORY_CHAPTERS * 400),
+        Scenario("list_chapters_long_fields", "GET", "/api/stories/{long_story}/chapters?fields=id,number,title",
+                 queries=1, max_bytes=LONG_STORY_CHAPTERS * 80),
+        Scenario("get_chapter_long", "GET", "/api/stories/{long_story}/chapters/{long_chapter}", queries=1),
+        Scenario("list_comments_story", "GET", "/api/comments?story_id={story}", queries=1),
+        Scenario("list_comments", "GET", "/api/comments", queries=1),
+        Scenario("list_chapter_comments", "GET", "/api/stories/{story}/chapters/{chapter}/comments", queries=1),
+        # keyset pages from the middle of the long thread, one per index (global, per story, per chapter)
+        Scenario("list_comments_cursor", "GET", "/api/comments?cursor={comment_cursor}&per_page={per_page}",
+                 queries=1, scale=("per_page", 5, 100)),
+        Scenario("list_comments_story_cursor", "GET",
+                 "/api/comments?story_id={long_story}&cursor={comment_cursor}&per_page={per_page}",
+                 queries=1, scale=("per_page", 5, 100)),
+        Scenario("list_chapter_comments_cursor", "GET",
+                 "/api/stories/{long_story}/chapters/{long_chapter}/comments?cursor={comment_cursor}&per_page={per_page}",
+                 queries=1, scale=("per_page", 5, 100)),
+        Scenario("list_follows", "GET", "/api/follows?following_id={author}", queries=1),
+        Scenario("list_follows_cursor", "GET", "/api/follows?following_id={author}&cursor=&per_page={per_page}",
+                 queries=1, scale=("per_page", 5, 200)),
+        Scenario("check_follows", "GET", "/api/follows/check?user_ids={author},{me}", auth=True, queries=1),
+        Scenario("get_user_page", "GET", "/api/user?cursor=&per_page={per_page}", queries=1, scale=("per_page", 5, 200)),
+        Scenario("get_me", "GET", "/api/user/me", auth=True, queries=1),
+        Scenario("update_me", "PATCH", "/api/user/me", json={"bio": "bench"}, auth=True, queries=2, p95_ms=W),
+        Scenario("recent_stories", "GET", "/api/user/me/recent-stories", auth=True, queries=2),
+        Scenario("my_feed", "GET", "/api/user/me/feed?per_page={per_page}", auth=True, queries=4, scale=("per_page", 5, 50)),
+        Scenario("register", "POST", "/api/auth/register", setup=_fresh, status=201, queries=2, p95_ms=W,
+                 json={"email": "bench{n}@example.com", "password": "x", "display_name": "bench{n}"}),
+        Scenario("login", "POST", "/api/auth/login", json={"email": "bench@example.com", "password": "bench"}, queries=1),
+        Scenario("create_category", "POST", "/api/categories", setup=_fresh, status=201, auth=True, queries=3, p95_ms=W,
+                 json={"name": "Bench {n}"}),
+        Scenario("create_tag", "POST", "/api/tags", setup=_fresh, status=201, auth=True, queries=3, p95_ms=W,
+                 json={"name": "bench-tag-{n}"}),
+        Scenario("create_story", "POST", "/api/stories", status=201, auth=True, queries=9, p95_ms=W,
+                 json={"title": "Bench", "synopsis": "bench", "tags": ["bench", "epic", "dark fantasy"]}),
+        # the write budgets are the routes' @query_budget minus the cache_version bump, as the cache is bypassed
+        Scenario("create_story_category", "POST", "/api/stories", setup=_fresh, status=201, auth=True, queries=9,
+                 p95_ms=W, json={"title": "Bench", "synopsis": "bench", "category_id": "{category}",
+                                 "tags": ["bench", "bench new {n}"]}),
+        Scenario("update_story", "PATCH", "/api/stories/{own_story}", auth=True, queries=11, p95_ms=W,
+                 json={"title": "Bench story", "tags": ["bench"]}),
+        # publishing fans the story out to the fixture author, who follows the bench user
+        Scenario("update_story_publish", "PATCH", "/api/stories/{target}", setup=_new_draft, auth=True, queries=11,
+                 p95_ms=W, json={"status": "PUBLISHED", "category_id": "{category}",
+                                 "tags": ["bench", "bench publish {n}"]}),
+        Scenario("create_chapter", "POST", "/api/stories/{own_story}/chapters", setup=_fresh, status=201, auth=True,
+                 queries=3, p95_ms=W, json={"title": "Bench", "number": "{n}", "content": "bench"}),
+        Scenario("update_chapter", "PATCH", "/api/stories/{own_story}/chapters/{own_chapter}", auth=True, queries=3,
+                 p95_ms=W, json={"content": "bench"}),
+        Scenario("delete_chapter", "DELETE", "/api/stories/{own_story}/chapters/{target}", setup=_new_chapter,
+                 status=204, auth=True, queries=4, p95_ms=W),
+        Scenario("get_chapter_draft", "GET", "/api/stories/{own_story}/chapters/{target}", setup=_new_chapter,
+                 auth=True, queries=2),
+        Scenario("mark_view", "POST", "/api/stories/{story}/view", status=202, auth=True, queries=0, p95_ms=W),
+        Scenario("create_comment", "POST", "/api/comments", status=201, auth=True, queries=3, p95_ms=W,
+                 json={"story_id": "{story}", "text": "bench"}),
+        Scenario("create_chapter_comment", "POST", "/api/stories/{story}/chapters/{chapter}/comments", status=201,
+                 auth=True, queries=4, p95_ms=W, json={"text": "bench"}),
+        Scenario("delete_comment", "DELETE", "/api/comments/{target}", setup=_new_comment, status=204, auth=True,
+                 queries=3, p95_ms=W),
+        Scenario("follow", "POST", "/api/follows", setup=_not_following, status=201, auth=True, queries=2, p95_ms=W,
+                 json={"following_id": "{author}"}),
+        # delete the edge, move both counters, drop the author's items from the caller's feed
+        Scenario("unfollow", "DELETE", "/api/follows?following_id={author}", setup=_following, status=204, auth=True,
+                 queries=3, p95_ms=W),
+        Scenario("cache_stats", "GET", "/api/cache/stats", auth=True, queries=0),
+        Scenario("export_stories_incremental", "GET", "/api/export/stories?since=2999-01-01T00:00:00Z", auth=True,
+                 queries=1),
+    ]
+
+
+def _fill(value, params):
+    if isinstance(value, str):
+        filled = value.format(**params)
+        return int(filled) if value.startswith("{") and value.endswith("}") and filled.isdigit() else filled
+    if isinstance(value, dict):
+        return {k: _fill(v, params) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, params) for v in value]
+    return value
+
+
+def _measure(ctx, sc, extra):
+    params = dict(ctx.values, **extra)
+    url, body = _fill(sc.url, params), _fill(sc.json, params)
+    with count_queries() as counter:
+        started = time.perf_counter()
+        response = ctx.request(sc.method, url, body, auth=sc.auth)
+        size = len(response.get_data())
+        elapsed = (time.perf_counter() - started) * 1000
+    return response.status_code, elapsed, counter.count, counter.rows, size
+
+
+def run_bench(app, iterations=20, latency_scale=1.0, only=None, log=print):
+    """Runs every scenario; returns (results, failures)."""
+    backend, result_cache.backend = result_cache.backend, None
+    try:
+        ctx = BenchContext(app.test_client())
+        ctx.setup_fixtures()
+        results, failures = [], []
+        for sc in scenarios():
+            if only and sc.name not in only:
+                continue
+            base = {sc.scale[0]: sc.scale[2]} if sc.scale else {}
+            timings, queries, rows, size, statuses = [], 0, 0, 0, set()
+            for i in range(iterations + 2):
+                extra = dict(base, **(sc.setup(ctx) if sc.setup else {}))
+                status, ms, n_queries, n_rows, n_bytes = _measure(ctx, sc, extra)
+                statuses.add(status)
+                if i >= 2:  # first two runs warm caches and connections
+                    timings.append(ms)
+                    queries, rows, size = max(queries, n_queries), max(rows, n_rows), max(size, n_bytes)
+
+            result = {
+                "name": sc.name,
+                "p50_ms": round(_percentile(timings, 50), 2),
+                "p95_ms": round(_percentile(timings, 95), 2),
+                "queries": queries,
+                "rows": rows,
+                "bytes": size,
+            }
+            budget_ms = sc.p95_ms * latency_scale
+            if statuses != {sc.status}:
+                failures.append(f"{sc.name}: expected HTTP {sc.status}, got {sorted(statuses)}")
+            if sc.queries is not None and queries > sc.queries:
+                failures.append(f"{sc.name}: {queries} SQL statements, budget {sc.queries}")
+            if result["p95_ms"] > budget_ms:
+                failures.append(f"{sc.name}: p95 {result['p95_ms']}ms, budget {budget_ms:g}ms")
+            if sc.max_bytes is not None and size > sc.max_bytes:
+                failures.append(f"{sc.name}: {size} byte response, budget {sc.max_bytes}")
+            if sc.scale:
+                arg, small, large = sc.scale
+                counts = {}
+                for page_size in (small, large):
+                    extra = dict(sc.setup(ctx) if sc.setup else {}, **{arg: page_size})
+                    counts[page_size] = _measure(ctx, sc, extra)[2]
+                result["queries_small_page"] = counts[small]
+                # one statement of slack: an eager load is skipped when every key on the small page is NULL
+                if counts[large] > counts[small] + 1:
+                    failures.append(f"{sc.name}: {counts[small]} statements for {arg}={small} but "
+                                    f"{counts[large]} for {arg}={large} (N+1)")
+            results.append(result)
+            log(f"{sc.name:<28} p50 {result['p50_ms']:>8.2f}ms  p95 {result['p95_ms']:>8.2f}ms  "
+                f"queries {queries:>3}  rows {rows:>5}  bytes {size:>8}")
+
+        if not only or "list_chapters_long" in only:
+            results.append(compare_chapter_listing(app, ctx, iterations, log))
+
+        covered = {sc.url.split("?")[0] for sc in scenarios()}
+        missing = [rule.rule for rule in app.url_map.iter_rules()
+                   if rule.endpoint.startswith("api.") and not any(_matches(rule.rule, u) for u in covered)]
+        if missing and not only:
+            failures.append(f"routes without a benchmark scenario: {', '.join(sorted(missing))}")
+        return results, failures
+    finally:
+        result_cache.backend = backend
+
+
+def _matches(rule, url):
+    rule_parts, url_parts = rule.strip("/").split("/"), url.strip("/").split("/")
+    if len(rule_parts) != len(url_parts):
+        return False
+    return all(r == u or (r.startswith("<") and u.startswith("{")) for r, u in zip(rule_parts, url_parts))
+
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVING_PATHS = (
+    "/api/stories",
+    "/api/stories?tag={tag}",
+    "/api/stories/{story}",
+    "/api/stories/{story}/chapters",
+    "/api/comments?story_id={story}",
+    "/api/follows?following_id={author}",
+)
+
+
+def _start_server(kind, workers, port, db_url):
+    if kind == "sync":
+        cmd = [sys.executable, "-m", "gunicorn", "wsgi", "-w", str(workers), "-b", f"127.0.0.1:{port}"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:application", "--workers", str(workers),
+               "--port", str(port), "--log-level", "warning"]
+    # the response cache would hide the database path being compared
+    env = dict(os.environ, DATABASE_URL=db_url, RESULT_CACHE_SIZE="0")
+    proc = subprocess.Popen(cmd, cwd=SRC_DIR, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            conn = HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/hello")
+            if conn.getresponse().status == 200:
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError(f"{kind} server did not start on port {port}")
+
+
+def _drive(port, paths, concurrency, duration):
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        conn = HTTPConnection("127.0.0.1", port, timeout=30)
+        mine, failed = [], 0
+        for n in itertools.count(offset):
+            if time.monotonic() >= deadline:
+                break
+            started = time.perf_counter()
+            try:
+                conn.request("GET", paths[n % len(paths)])
+                response = conn.getresponse()
+                response.read()
+                ok = response.status == 200
+            except OSError:
+                conn.close()
+                conn = HTTPConnection("127.0.0.1", port, timeout=30)
+                ok = False
+            if ok:
+                mine.append((time.perf_counter() - started) * 1000)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / duration, 1),
+        "p50_ms": round(_percentile(latencies, 50), 2) if latencies else None,
+        "p95_ms": round(_percentile(latencies, 95), 2) if latencies else None,
+        "errors": errors[0],
+    }
+
+
+def compare_serving(app, workers=2, concurrency=32, duration=10, port=8731, log=print):
+    """Runs the same read traffic against gunicorn (sync) and uvicorn (async); returns both results."""
+    story = (Story.query.filter_by(status=StoryStatus.PUBLISHED)
+             .order_by(Story.views_count.desc(), Story.id.asc()).first())
+    if story is None:
+        raise RuntimeError("no published story to read, seed the database first")
+    tag = story.tags[0].slug if story.tags else ""
+    paths = [p.format(story=story.id, author=story.author_id, tag=tag) for p in SERVING_PATHS]
+    db_url = app.config["SQLALCHEMY_DATABASE_URI"]
+
+    results = {}
+    for kind in ("sync", "async"):
+        proc = _start_server(kind, workers, port, db_url)
+        try:
+            _drive(port, paths, min(concurrency, 4), 1)  # warm up pools and caches
+            results[kind] = _drive(port, paths, concurrency, duration)
+        finally:
+            proc.terminate()
+            proc.wait()
+        r = results[kind]
+        log(f"{kind:<6} {r['rps']:>8.1f} req/s  p50 {r['p50_ms']}ms  p95 {r['p95_ms']}ms  errors {r['errors']}")
+    if results["sync"]["rps"]:
+        log(f"async/sync throughput: {results['async']['rps'] / results['sync']['rps']:.2f}x "
+            f"with {workers} workers and {concurrency} concurrent clients")
+    return results
@@ -0,0 +1,220 @@
+"""
+Versioned response cache for hot read endpoints.
+
+Cached bodies are keyed on (namespace, namespace version, normalized query
+string, Accept-Language). Any committed write touching a watched table bumps
+the namespace version, so later reads miss and recompute instead of serving
+a stale page; old entries simply age out. Entries also expire after
+RESULT_CACHE_TTL seconds, which bounds the drift of the *_human fields.
+
+Backends: in-process (default) or Redis when RESULT_CACHE_URL is set, which
+shares entries and versions across workers. The in-process backend keeps the
+entries per process but reads the versions from the cache_version table, once
+per request and from the primary, so a bump in any worker or CLI job (e.g.
+`flask flush-views`) reaches every process before its next lookup.
+
+A response built from a read replica within REPLICA_STICKY_SECONDS of a
+local bump of its namespace is not stored: the replica may not have the
+write yet, and caching it would keep the stale page for the whole TTL.
+"""
+import functools
+import os
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from api.models import db, CacheVersion
+from api.utils import LRUCache
+
+# table name -> namespaces whose cached responses it feeds
+WATCHED_TABLES = {
+    "story": ("stories",),
+    "story_tag": ("stories",),
+    "story_view": ("stories",),
+    "chapter": ("stories",),
+    "comment": ("stories",),
+    "tag": ("stories",),
+    "category": ("stories",),
+    "story_similarity": ("stories",),
+    "story_trending": ("stories",),
+}
+
+
+class InProcessBackend:
+    def __init__(self, maxsize, ttl):
+        self._entries = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self._entries.get(key)
+
+    def set(self, key, value):
+        self._entries.set(key, value)
+
+    @staticmethod
+    def _seen():
+        # versions already read by this request; outside a request every call reads the table
+        return g.setdefault("result_cache_versions", {}) if has_request_context() else {}
+
+    def version(self, namespace):
+        seen = self._seen()
+        if namespace not in seen:
+            # straight on the engine: a replica could still hold the old version
+            with db.engine.connect() as conn:
+                seen[namespace] = conn.scalar(
+                    select(CacheVersion.version).where(CacheVersion.namespace == namespace)
+                ) or 0
+        return seen[namespace]
+
+    def bump(self, namespace):
+        dialect_insert = postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert
+        table = CacheVersion.__table__
+        with db.engine.begin() as conn:
+            conn.execute(
+                dialect_insert(table).values(namespace=namespace, version=1)
+                .on_conflict_do_update(index_elements=["namespace"], set_={"version": table.c.version + 1})
+            )
+        self._seen().pop(namespace, None)
+
+
+class RedisBackend:
+    def __init__(self, url, ttl, prefix="dreamers:cache:"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESULT_CACHE_URL is set but the redis package is not installed")
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._redis.get(self._prefix + key)
+        if raw is None:
+            return None
+        status, _, body = raw.partition(b"\n")
+        return int(status), body
+
+    def set(self, key, value):
+        status, body = value
+        self._redis.setex(self._prefix + key, self._ttl, str(status).encode() + b"\n" + body)
+
+    def version(self, namespace):
+        return int(self._redis.get(self._prefix + "v:" + namespace) or 0)
+
+    def bump(self, namespace):
+        self._redis.incr(self._prefix + "v:" + namespace)
+
+
+class ResultCache:
+    def __init__(self, app=None):
+        self.backend = None
+        self._stats = {}
+        self._bumped_at = {}
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("RESULT_CACHE_URL", os.getenv("RESULT_CACHE_URL"))
+        app.config.setdefault("RESULT_CACHE_TTL", int(os.getenv("RESULT_CACHE_TTL", 60)))
+        app.config.setdefault("RESULT_CACHE_SIZE", int(os.getenv("RESULT_CACHE_SIZE", 512)))
+        ttl = app.config["RESULT_CACHE_TTL"]
+        if app.config["RESULT_CACHE_URL"]:
+            self.backend = RedisBackend(app.config["RESULT_CACHE_URL"], ttl)
+        else:
+            self.backend = InProcessBackend(app.config["RESULT_CACHE_SIZE"], ttl)
+
+    def _count(self, namespace, field):
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {"hits": 0, "misses": 0})
+            stats[field] += 1
+
+    def stats(self):
+        with self._lock:
+            out = {}
+            for namespace, stats in self._stats.items():
+                lookups = stats["hits"] + stats["misses"]
+                out[namespace] = dict(stats, hit_ratio=round(stats["hits"] / lookups, 4) if lookups else None)
+            return out
+
+    def bump(self, *namespaces):
+        if self.backend is None:
+            return
+        for namespace in namespaces:
+            self.backend.bump(namespace)
+            self._bumped_at[namespace] = time.monotonic()
+
+    def _may_lag(self, namespace):
+        if not g.get("db_replica_read"):
+            return False
+        window = current_app.config.get("REPLICA_STICKY_SECONDS", 0)
+        return time.monotonic() - self._bumped_at.get(namespace, float("-inf")) < window
+
+    @staticmethod
+    def _request_key():
+        # a blank ?cursor= still switches list_stories to cursor mode, so it is part of the key
+        args = sorted(
+            (k, v.strip()) for k, v in request.args.items(multi=True) if v.strip() or k == "cursor"
+        )
+        lang = (request.headers.get("Accept-Language") or "").split(",")[0].strip().lower()
+        return "&".join(f"{k}={v}" for k, v in args) + "|" + lang
+
+    def cached(self, namespace):
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return view(*args, **kwargs)
+                key = f"{namespace}:{self.backend.version(namespace)}:{request.path}?{self._request_key()}"
+                hit = self.backend.get(key)
+                if hit is not None:
+                    self._count(namespace, "hits")
+                    status, body = hit
+                    return current_app.response_class(body, status=status, mimetype="application/json")
+                self._count(namespace, "misses")
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not self._may_lag(namespace):
+                    self.backend.set(key, (response.status_code, response.get_data()))
+                return response
+            return wrapper
+        return decorator
+
+
+result_cache = ResultCache()
+
+
+def _mark(session, table_name):
+    namespaces = WATCHED_TABLES.get(table_name)
+    if namespaces:
+        session.info.setdefault("result_cache_bump", set()).update(namespaces)
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            _mark(session, table.name)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statements(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _mark(orm_execute_state.session, table.name)
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session):
+    namespaces = session.info.pop("result_cache_bump", None)
+    if namespaces:
+        result_cache.bump(*namespaces)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session):
+    session.info.pop("result_cache_bump", None)
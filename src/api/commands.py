@@ -1,6 +1,16 @@
 
 import click
+from datetime import datetime, timezone
 from api.models import db, User
+from api.search import ensure_sqlite_index
+from api.counters import recount_story_counters, recount_follow_counters
+from api.viewbuffer import view_buffer
+from api.export import iter_story_export, parse_watermark
+from api.seed import seed_database
+from api.bench import run_bench, compare_serving
+from api.feed import trim_feeds, FEED_MAX_ITEMS
+from api.similar import build_similar, SIMILAR_TOP_K, SIMILAR_VIEW_WEIGHT
+from api.trending import recompute_trending
 
 """
 In this file, you can add as many commands as you want using the @app.cli.command decorator
@@ -21,14 +31,135 @@ def setup_commands(app):
         for x in range(1, int(count) + 1):
             user = User()
             user.email = "test_user" + str(x) + "@test.com"
+            user.display_name = "Test User " + str(x)
             user.password = "123456"
             user.is_active = True
             db.session.add(user)
-            db.session.commit()
             print("User: ", user.email, " created.")
 
+        db.session.commit()
         print("All test users created")
 
+    @app.cli.command("reindex-search")
+    def reindex_search():
+        """ Creates or rebuilds the story full-text index (SQLite only, Postgres keeps a generated column) """
+        if db.engine.dialect.name != "sqlite":
+            print("Nothing to do: story.search_vector is maintained by Postgres")
+            return
+        ensure_sqlite_index(rebuild=True)
+        print("Story search index rebuilt")
+
+    @app.cli.command("recount-story-stats")
+    def recount_story_stats():
+        """ Recomputes Story.comments_count and Story.views_count from the comment and story_view tables """
+        updated = recount_story_counters()
+        db.session.commit()
+        print("Recounted stats for", updated, "stories")
+
+    @app.cli.command("recount-follow-stats")
+    def recount_follow_stats():
+        """ Recomputes User.followers_count and User.following_count from the follower table """
+        updated = recount_follow_counters()
+        db.session.commit()
+        print("Recounted follows for", updated, "users")
+
+    @app.cli.command("flush-views")
+    def flush_views():
+        """ Applies buffered story views, including logs left behind by crashed workers """
+        applied = view_buffer.flush()
+        print("Applied", applied, "buffered views")
+
+    @app.cli.command("build-similar")
+    @click.option("--top-k", default=SIMILAR_TOP_K, show_default=True, help="neighbors kept per story")
+    @click.option("--view-weight", default=SIMILAR_VIEW_WEIGHT, show_default=True,
+                  help="share of co-viewing in the score, the rest is tag overlap")
+    @click.option("--workers", default=None, type=int, help="processes (default: CPU count)")
+    def build_similar_command(top_k, view_weight, workers):
+        """ Rebuilds the story_similarity neighbor table from tags and co-views (needs numpy and scipy) """
+        try:
+            written = build_similar(top_k=top_k, view_weight=view_weight, workers=workers)
+        except RuntimeError as e:
+            raise click.ClickException(str(e))
+        print("Stored", written, "similar-story rows")
+
+    @app.cli.command("recompute-trending")
+    @click.option("--rebuild", is_flag=True, help="drop every score and reseed from timestamps first")
+    def recompute_trending_command(rebuild):
+        """ Folds views and comments since the last run into the story_trending ranking """
+        written, removed = recompute_trending(rebuild=rebuild)
+        print("Updated", written, "trending scores, removed", removed)
+
+    @app.cli.command("trim-feeds")
+    @click.option("--max-items", default=FEED_MAX_ITEMS, show_default=True, help="entries kept per feed")
+    def trim_feeds_command(max_items):
+        """ Drops the oldest home feed entries beyond --max-items for every user """
+        removed = trim_feeds(max_items)
+        db.session.commit()
+        print("Removed", removed, "feed entries")
+
+    @app.cli.command("export-stories")
+    @click.option("--since", default=None, help="ISO-8601 watermark, only stories changed after it")
+    @click.option("--output", "-o", type=click.File("w"), default="-", help="File to write, stdout by default")
+    def export_stories(since, output):
+        """ Streams published stories with chapters, tags and counters as NDJSON """
+        try:
+            watermark = parse_watermark(since)
+        except ValueError:
+            raise click.BadParameter("expected an ISO-8601 timestamp", param_hint="--since")
+        started_at = datetime.now(timezone.utc)
+        count = 0
+        for line in iter_story_export(watermark):
+            output.write(line)
+            count += 1
+        click.echo(f"Exported {count} stories, next watermark: {started_at.isoformat()}", err=True)
+
+    """
+    Seeds a realistic, reproducible dataset for performance work, for example:
+    $ flask insert-test-data --users 1000000 --stories 200000 --views 20000000 --seed 7
+    """
     @app.cli.command("insert-test-data")
-    def insert_test_data():
-        pass
\ No newline at end of file
+    @click.option("--users", default=10000, show_default=True)
+    @click.option("--stories", default=2000, show_default=True)
+    @click.option("--chapters-per-story", default=5, show_default=True, help="average, at most 12")
+    @click.option("--tags", default=500, show_default=True)
+    @click.option("--follows", default=100000, show_default=True, help="total follow edges (approximate)")
+    @click.option("--views", default=200000, show_default=True, help="total (user, story) view rows (approximate)")
+    @click.option("--comments", default=50000, show_default=True)
+    @click.option("--seed", default=42, show_default=True)
+    @click.option("--until", default=None, help="ISO date the generated timeline ends at (default: today)")
+    @click.option("--workers", default=None, type=int, help="generator processes (default: CPU count)")
+    @click.option("--batch-size", default=10000, show_default=True)
+    def insert_test_data(users, stories, chapters_per_story, tags, follows, views, comments,
+                         seed, until, workers, batch_size):
+        try:
+            until = parse_watermark(until)
+        except ValueError:
+            raise click.BadParameter("expected an ISO-8601 date", param_hint="--until")
+        seed_database(users, stories, chapters_per_story, tags, follows, views, comments,
+                      seed=seed, until=until, workers=workers, batch_size=batch_size)
+        print("Test data inserted")
+
+    @app.cli.command("bench")
+    @click.option("--iterations", default=20, show_default=True, help="timed requests per endpoint")
+    @click.option("--latency-scale", default=1.0, show_default=True, help="multiplier for the p95 latency budgets")
+    @click.option("--only", multiple=True, help="scenario name to run, can be repeated")
+    @click.option("--output", "-o", type=click.File("w"), default=None, help="also write the results as JSON")
+    def bench(iterations, latency_scale, only, output):
+        """ Benchmarks every API endpoint against its latency and SQL statement budgets """
+        results, failures = run_bench(app, iterations=iterations, latency_scale=latency_scale, only=set(only))
+        if output is not None:
+            output.write(app.json.dumps({"results": results, "failures": failures}) + "\n")
+        for failure in failures:
+            print("FAIL", failure)
+        if failures:
+            raise SystemExit(1)
+        print("All endpoints within budget")
+
+    @app.cli.command("bench-serving")
+    @click.option("--workers", default=2, show_default=True, help="worker processes for each server")
+    @click.option("--concurrency", default=32, show_default=True, help="concurrent client connections")
+    @click.option("--duration", default=10, show_default=True, help="seconds of traffic per server")
+    @click.option("--port", default=8731, show_default=True)
+    def bench_serving(workers, concurrency, duration, port):
+        """ Compares read throughput of the sync (gunicorn) and async (uvicorn) serving paths """
+        compare_serving(app, workers=workers, concurrency=concurrency, duration=duration, port=port)
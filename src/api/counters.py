@@ -0,0 +1,71 @@
+"""
+Denormalized Story.comments_count / Story.views_count and
+User.followers_count / User.following_count.
+
+Writers bump the counters with a single atomic UPDATE in the same transaction
+as the row they add or remove; `flask recount-story-stats` and
+`flask recount-follow-stats` recompute them from the comment, story_view and
+follower tables if they ever drift.
+"""
+from sqlalchemy import case, func, select, update
+
+from api.models import db, Story, Comment, StoryView, User, Follower
+
+
+def bump_story_counters(story_id, comments=0, views=0):
+    values = {
+        # keep updated_at untouched: a view or a comment is not an edit of the story
+        "updated_at": Story.updated_at,
+    }
+    if comments:
+        values["comments_count"] = Story.comments_count + comments
+    if views:
+        values["views_count"] = Story.views_count + views
+    db.session.execute(update(Story).where(Story.id == story_id).values(**values))
+
+
+def recount_story_counters(story_ids=None):
+    live_comments = (select(func.count(Comment.id))
+                     .where(Comment.story_id == Story.id, Comment.deleted_at.is_(None))
+                     .scalar_subquery())
+    total_views = (select(func.coalesce(func.sum(StoryView.view_count), 0))
+                   .where(StoryView.story_id == Story.id)
+                   .scalar_subquery())
+    stmt = update(Story).values(
+        comments_count=live_comments,
+        views_count=total_views,
+        updated_at=Story.updated_at,
+    )
+    if story_ids is not None:
+        stmt = stmt.where(Story.id.in_(story_ids))
+    return db.session.execute(stmt).rowcount
+
+
+def bump_follow_counters(follower_id, following_id, delta):
+    """Adjusts both ends of one follow edge in a single UPDATE."""
+    db.session.execute(
+        update(User)
+        .where(User.id.in_((follower_id, following_id)))
+        .values(
+            followers_count=case((User.id == following_id, User.followers_count + delta), else_=User.followers_count),
+            following_count=case((User.id == follower_id, User.following_count + delta), else_=User.following_count),
+            updated_at=User.updated_at,
+        )
+    )
+
+
+def recount_follow_counters(user_ids=None):
+    followers = (select(func.count(Follower.id))
+                 .where(Follower.following_id == User.id)
+                 .scalar_subquery())
+    following = (select(func.count(Follower.id))
+                 .where(Follower.follower_id == User.id)
+                 .scalar_subquery())
+    stmt = update(User).values(
+        followers_count=followers,
+        following_count=following,
+        updated_at=User.updated_at,
+    )
+    if user_ids is not None:
+        stmt = stmt.where(User.id.in_(user_ids))
+    return db.session.execute(stmt).rowcount
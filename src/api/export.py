@@ -0,0 +1,62 @@
+"""
+NDJSON export of the published catalog.
+
+One line per published story with its category, tags, published chapters and
+comment/view counters. Stories are read through a server-side cursor in chunks
+of EXPORT_CHUNK rows (chapters, tags and categories are loaded per chunk with
+SELECT ... IN) and the session is cleared after every chunk, so memory use is
+independent of the catalog size. Passing `since` limits the export to stories
+whose row or any chapter changed after that watermark.
+"""
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import or_, select
+from sqlalchemy.orm import selectinload, undefer
+
+from api.models import db, Story, StoryStatus, Chapter, ChapterStatus
+from api.timefmt import TimeFormatter
+
+EXPORT_CHUNK = 500
+
+
+def parse_watermark(value):
+    """Parses an ISO-8601 watermark; returns None for an empty value and raises ValueError when malformed."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def iter_story_export(since=None, chunk=EXPORT_CHUNK):
+    """Yields one NDJSON line (with trailing newline) per exported story."""
+    fmt = TimeFormatter(human=False)
+    dumps = current_app.json.dumps
+    stmt = (select(Story)
+            .where(Story.status == StoryStatus.PUBLISHED)
+            .order_by(Story.id.asc())
+            .options(
+                selectinload(Story.category),
+                selectinload(Story.tags),
+                selectinload(Story.chapters.and_(
+                    Chapter.status == ChapterStatus.PUBLISHED,
+                    Chapter.deleted_at.is_(None),
+                )).options(undefer(Chapter.content)),
+            )
+            .execution_options(yield_per=chunk))
+    if since is not None:
+        changed_chapters = select(Chapter.story_id).where(Chapter.updated_at > since)
+        stmt = stmt.where(or_(Story.updated_at > since, Story.id.in_(changed_chapters)))
+
+    result = db.session.execute(stmt).scalars()
+    for partition in result.partitions():
+        for story in partition:
+            record = dict(
+                story.serialize(fmt=fmt),
+                comments_count=story.comments_count,
+                views_count=story.views_count,
+                chapters=[c.serialize(fmt=fmt) for c in story.chapters],
+            )
+            yield dumps(record) + "\n"
+        db.session.expunge_all()
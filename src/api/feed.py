@@ -0,0 +1,188 @@
+"""
+Home feed: stories and chapters published by the authors a user follows.
+
+Fan-out on write: publishing a story (or a chapter of a published story)
+copies one feed_item row per follower with a single INSERT ... SELECT from
+follower, so reading a feed is one keyset query on (user_id, published_at, id).
+
+Authors with more than FEED_FANOUT_LIMIT followers are skipped at publish
+time (checked inside the same INSERT ... SELECT). Their followers pull them instead (fan-out on read): before serving
+the first page, at most once every FEED_PULL_INTERVAL seconds per user,
+their latest stories and chapters are copied into the reader's feed. The
+same step trims the feed to FEED_MAX_ITEMS entries. `flask trim-feeds` trims
+every feed. Unfollowing an author removes their items from the follower's feed.
+"""
+import os
+
+from sqlalchemy import Integer, delete, func, literal, null, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import load_only
+
+from api.loaders import story_options
+from api.models import db, FeedItem, Follower, User, Story, StoryStatus, Chapter, ChapterStatus
+from api.pagination import after_anchor_desc
+from api.utils import LRUCache
+
+FEED_FANOUT_LIMIT = int(os.getenv("FEED_FANOUT_LIMIT", 10000))
+FEED_MAX_ITEMS = int(os.getenv("FEED_MAX_ITEMS", 500))
+FEED_PULL_INTERVAL = int(os.getenv("FEED_PULL_INTERVAL", 60))
+
+_COLUMNS = ["user_id", "story_id", "chapter_id", "author_id", "published_at"]
+
+# user id -> followed authors served by fan-out on read
+_pull_authors = LRUCache(maxsize=4096, ttl=300, name="feed_pull_authors")
+# user ids whose feed was refreshed within FEED_PULL_INTERVAL
+_refreshed = LRUCache(maxsize=16384, ttl=FEED_PULL_INTERVAL)
+
+
+def _insert():
+    dialect_insert = postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert
+    return dialect_insert(FeedItem.__table__)
+
+
+def _fan_out(author_id, story_id, chapter_id, published_at):
+    """`published_at` is a scalar subquery, so the timestamp the flush just wrote is copied as stored."""
+    follower_count = select(User.followers_count).where(User.id == author_id).scalar_subquery()
+    stmt = _insert().from_select(
+        _COLUMNS,
+        select(Follower.follower_id, literal(story_id), literal(chapter_id, Integer), literal(author_id), published_at)
+        .where(Follower.following_id == author_id, follower_count <= FEED_FANOUT_LIMIT),
+    ).on_conflict_do_nothing()
+    return db.session.execute(stmt).rowcount
+
+
+def fan_out_story(story):
+    """Pushes a just-published story to its author's followers; call after the flush that set published_at."""
+    published_at = select(Story.published_at).where(Story.id == story.id).scalar_subquery()
+    return _fan_out(story.author_id, story.id, None, published_at)
+
+
+def fan_out_chapter(chapter, story):
+    if story.status != StoryStatus.PUBLISHED:
+        return 0  # the story itself is announced when it is published
+    published_at = select(Chapter.published_at).where(Chapter.id == chapter.id).scalar_subquery()
+    return _fan_out(story.author_id, story.id, chapter.id, published_at)
+
+
+def retract(story_id=None, chapter_id=None):
+    """Removes an unpublished or deleted story (with its chapters) or chapter from every feed."""
+    if chapter_id is not None:
+        db.session.execute(delete(FeedItem).where(FeedItem.chapter_id == chapter_id))
+    else:
+        db.session.execute(delete(FeedItem).where(FeedItem.story_id == story_id))
+
+
+def drop_author(user_id, author_id):
+    """Removes an unfollowed author's stories and chapters from the user's feed."""
+    db.session.execute(delete(FeedItem).where(FeedItem.user_id == user_id, FeedItem.author_id == author_id))
+    _pull_authors.pop(user_id)
+
+
+def pull_authors(user_id):
+    authors = _pull_authors.get(user_id)
+    if authors is None:
+        authors = list(db.session.scalars(
+            select(Follower.following_id)
+            .join(User, User.id == Follower.following_id)
+            .where(Follower.follower_id == user_id, User.followers_count > FEED_FANOUT_LIMIT)
+        ))
+        _pull_authors.set(user_id, authors)
+    return authors
+
+
+def refresh_feed(user_id):
+    """Pulls followed high-fan-out authors into the feed and trims it; returns True when it ran."""
+    if _refreshed.get(user_id):
+        return False
+    authors = pull_authors(user_id)
+    if authors:
+        stories = (select(literal(user_id).label("user_id"), Story.id.label("story_id"), null().label("chapter_id"),
+                          Story.author_id, Story.published_at)
+                   .where(Story.author_id.in_(authors), Story.status == StoryStatus.PUBLISHED,
+                          Story.published_at.isnot(None))
+                   .order_by(Story.published_at.desc())
+                   .limit(FEED_MAX_ITEMS))
+        chapters = (select(literal(user_id).label("user_id"), Chapter.story_id, Chapter.id.label("chapter_id"),
+                           Story.author_id, Chapter.published_at)
+                    .join(Story, Story.id == Chapter.story_id)
+                    .where(Story.author_id.in_(authors), Story.status == StoryStatus.PUBLISHED,
+                           Chapter.status == ChapterStatus.PUBLISHED, Chapter.deleted_at.is_(None),
+                           Chapter.published_at.isnot(None))
+                    .order_by(Chapter.published_at.desc())
+                    .limit(FEED_MAX_ITEMS))
+        for rows in (stories, chapters):
+            # SQLite needs a WHERE in INSERT ... SELECT ... ON CONFLICT to parse it
+            pulled = rows.subquery().select().where(true())
+            db.session.execute(_insert().from_select(_COLUMNS, pulled).on_conflict_do_nothing())
+    trim_feed(user_id)
+    db.session.commit()
+    _refreshed.set(user_id, True)
+    return True
+
+
+def trim_feed(user_id, max_items=FEED_MAX_ITEMS):
+    keep = (select(FeedItem.id).where(FeedItem.user_id == user_id)
+            .order_by(FeedItem.published_at.desc(), FeedItem.id.desc())
+            .limit(max_items))
+    db.session.execute(delete(FeedItem).where(FeedItem.user_id == user_id, FeedItem.id.not_in(keep)))
+
+
+def trim_feeds(max_items=FEED_MAX_ITEMS):
+    """Trims every feed to `max_items`; returns the number of rows removed."""
+    ranked = select(
+        FeedItem.id,
+        func.row_number().over(
+            partition_by=FeedItem.user_id,
+            order_by=(FeedItem.published_at.desc(), FeedItem.id.desc()),
+        ).label("rn"),
+    ).subquery()
+    stale = select(ranked.c.id).where(ranked.c.rn > max_items)
+    return db.session.execute(delete(FeedItem).where(FeedItem.id.in_(stale))).rowcount
+
+
+def feed_page(user_id, anchor_id=None, per_page=20):
+    """Returns (feed items, has_more), newest first."""
+    stmt = (select(FeedItem)
+            .where(FeedItem.user_id == user_id)
+            .order_by(FeedItem.published_at.desc(), FeedItem.id.desc())
+            .limit(per_page + 1))
+    if anchor_id is not None:
+        stmt = stmt.where(after_anchor_desc(FeedItem, FeedItem.published_at, anchor_id))
+    items = db.session.scalars(stmt).all()
+    return items[:per_page], len(items) > per_page
+
+
+def serialize_feed(items, fmt):
+    story_ids = {i.story_id for i in items}
+    chapter_ids = {i.chapter_id for i in items if i.chapter_id is not None}
+    stories = {}
+    if story_ids:
+        stories = {s.id: s for s in db.session.scalars(
+            select(Story).where(Story.id.in_(story_ids)).options(*story_options("story_card")))}
+    chapters = {}
+    if chapter_ids:
+        chapters = {c.id: c for c in db.session.scalars(
+            select(Chapter).where(Chapter.id.in_(chapter_ids))
+            .options(load_only(Chapter.id, Chapter.number, Chapter.title, Chapter.published_at)))}
+
+    out = []
+    for item in items:
+        story = stories.get(item.story_id)
+        chapter = chapters.get(item.chapter_id) if item.chapter_id is not None else None
+        if story is None or (item.chapter_id is not None and chapter is None):
+            continue
+        out.append({
+            "id": item.id,
+            "kind": "chapter" if chapter else "story",
+            "published_at": fmt.iso(item.published_at),
+            **fmt.humans(published_at=item.published_at),
+            "story": dict(story.serialize(fmt=fmt), comments_count=story.comments_count,
+                          views_count=story.views_count),
+            "chapter": {
+                "id": chapter.id,
+                "number": chapter.number,
+                "title": chapter.title,
+                "published_at": fmt.iso(chapter.published_at),
+            } if chapter else None,
+        })
+    return out
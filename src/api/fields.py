@@ -0,0 +1,75 @@
+"""
+Sparse fieldsets: ?fields=id,title,tags on the read endpoints.
+
+Each model lists its serializable keys in a FIELDS table of Field entries:
+how to render the key, which columns it reads and which relationship it
+needs. serialize() renders only the requested keys. The same table gives the
+load_only() columns and the relationship loaders, so an unrequested key is
+neither fetched nor formatted.
+"""
+
+
+class Field:
+    __slots__ = ("get", "columns", "relation", "human", "default")
+
+    def __init__(self, get, columns=(), relation=None, human=False, default=True):
+        self.get = get
+        self.columns = columns
+        self.relation = relation
+        self.human = human  # dropped by ?human=0
+        self.default = default  # part of the output when no ?fields= is given
+
+
+def column(name, default=True):
+    return Field(lambda obj, fmt: getattr(obj, name), (name,), default=default)
+
+
+def enum_value(name):
+    return Field(lambda obj, fmt: getattr(obj, name).value, (name,))
+
+
+def timestamp(name):
+    return Field(lambda obj, fmt: fmt.iso(getattr(obj, name)), (name,))
+
+
+def humanized(name):
+    return Field(lambda obj, fmt: fmt.human(getattr(obj, name)), (name,), human=True)
+
+
+def default_fields(model):
+    return frozenset(name for name, f in model.FIELDS.items() if f.default)
+
+
+def serialize_fields(obj, fmt, fields=None):
+    table = obj.FIELDS
+    names = (n for n, f in table.items() if f.default) if fields is None else (n for n in table if n in fields)
+    out = {}
+    for name in names:
+        f = table[name]
+        if f.human and not fmt.human_enabled:
+            continue
+        out[name] = f.get(obj, fmt)
+    return out
+
+
+def parse_fields(args, allowed):
+    """Reads ?fields=; returns (frozenset or None when absent, error code or None)."""
+    raw = (args.get("fields") or "").strip()
+    if not raw:
+        return None, None
+    fields = frozenset(name.strip() for name in raw.split(",") if name.strip())
+    if not fields or not fields <= allowed:
+        return None, "invalid_fields"
+    return fields, None
+
+
+def field_columns(model, fields, always=()):
+    """Column attributes behind `fields`, plus `always` (the primary key is always loaded)."""
+    names = set(always)
+    for name in fields:
+        names.update(model.FIELDS[name].columns)
+    return [getattr(model, n) for n in sorted(names)]
+
+
+def field_relations(model, fields):
+    return {model.FIELDS[n].relation for n in fields if model.FIELDS[n].relation}
@@ -0,0 +1,54 @@
+"""
+Follow graph writes and lookups.
+
+follower has one row per (follower_id, following_id) pair (uq_follower_pair),
+so following twice is a no-op instead of a duplicate edge, and the counters on
+User only move when an edge is really added or removed. Removing an edge also
+clears the author's items from the follower's home feed.
+"""
+from sqlalchemy import delete, exists, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.counters import bump_follow_counters
+from api.feed import drop_author
+from api.models import db, User, Follower
+
+
+def follow_user(follower_id, following_id):
+    """Returns (edge, created); edge is None when `following_id` is not a user."""
+    dialect_insert = postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert
+    table = Follower.__table__
+    target_exists = exists().where(User.id == following_id)
+    row = db.session.execute(
+        dialect_insert(table)
+        .from_select(["follower_id", "following_id"],
+                     select(literal(follower_id), literal(following_id)).where(target_exists))
+        .on_conflict_do_nothing(index_elements=["follower_id", "following_id"])
+        .returning(table.c.id)
+    ).first()
+    if row is not None:
+        bump_follow_counters(follower_id, following_id, 1)
+        return Follower(id=row.id, follower_id=follower_id, following_id=following_id), True
+    edge = db.session.scalars(select(Follower).filter_by(follower_id=follower_id, following_id=following_id)).first()
+    return edge, False
+
+
+def unfollow_user(follower_id, following_id):
+    """Returns False when there was no such edge."""
+    removed = db.session.execute(
+        delete(Follower).where(Follower.follower_id == follower_id, Follower.following_id == following_id)
+    ).rowcount
+    if removed:
+        bump_follow_counters(follower_id, following_id, -removed)
+        drop_author(follower_id, following_id)
+    return bool(removed)
+
+
+def followed_ids(follower_id, user_ids):
+    """The subset of `user_ids` that `follower_id` follows, in one index lookup."""
+    if not user_ids:
+        return set()
+    return set(db.session.scalars(
+        select(Follower.following_id)
+        .where(Follower.follower_id == follower_id, Follower.following_id.in_(set(user_ids)))
+    ))
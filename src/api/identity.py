@@ -0,0 +1,131 @@
+"""
+Caches for authenticated requests.
+
+CachingJWTManager remembers verified claims per encoded token (bounded LRU)
+so repeated requests with the same token skip signature verification until
+the token expires. current_identity() returns a minimal (id, user_role,
+is_active) record for the JWT subject from a short TTL cache, so routes that
+only need the caller's id or role do not load the full User row. A token whose
+user no longer exists gets a 401 from current_identity(). Deleting a user or
+changing their role or active flag drops both caches for that user when the
+session commits, instead of waiting for the TTL.
+"""
+import os
+import time
+import weakref
+from typing import NamedTuple, Optional
+
+from flask import abort, jsonify, make_response
+from flask_jwt_extended import JWTManager, get_jwt_identity, verify_jwt_in_request
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from api.models import db, User, UserRole
+from api.utils import LRUCache
+
+
+class Identity(NamedTuple):
+    id: int
+    user_role: UserRole
+    is_active: bool
+
+
+_identities = LRUCache(
+    maxsize=int(os.getenv("IDENTITY_CACHE_SIZE", 4096)),
+    ttl=int(os.getenv("IDENTITY_CACHE_TTL", 60)),
+    name="identities",
+)
+_managers = weakref.WeakSet()
+
+
+class CachingJWTManager(JWTManager):
+    def __init__(self, app=None, maxsize=4096, **kwargs):
+        self._claims = LRUCache(maxsize=maxsize, name="jwt_claims")
+        _managers.add(self)
+        super().__init__(app, **kwargs)
+
+    # flask-jwt-extended 4.6 routes every decode through this method
+    def _decode_jwt_from_config(self, encoded_token, csrf_value=None, allow_expired=False):
+        key = (encoded_token, csrf_value, allow_expired)
+        claims = self._claims.get(key)
+        if claims is not None and (allow_expired or claims.get("exp", float("inf")) > time.time()):
+            return dict(claims)
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        self._claims.set(key, dict(claims))
+        return claims
+
+    def forget_subject(self, user_id):
+        self._claims.evict(lambda claims: claims.get("sub") == str(user_id))
+
+
+def _subject_id():
+    uid = get_jwt_identity()
+    if uid is None:
+        return None
+    try:
+        return int(uid)
+    except (TypeError, ValueError):
+        return None
+
+
+def _lookup_identity(uid):
+    ident = _identities.get(uid)
+    if ident is None:
+        row = db.session.execute(
+            select(User.id, User.user_role, User.is_active).where(User.id == uid)
+        ).first()
+        if row is None:
+            return None
+        ident = Identity(*row)
+        _identities.set(uid, ident)
+    return ident
+
+
+def current_identity() -> Optional[Identity]:
+    uid = _subject_id()
+    if uid is None:
+        return None
+    ident = _lookup_identity(uid)
+    if ident is None:
+        # valid token for a user that has since been deleted
+        abort(make_response(jsonify({"error": "unauthorized"}), 401))
+    return ident
+
+
+def current_identity_optional() -> Optional[Identity]:
+    try:
+        verify_jwt_in_request(optional=True)
+    except Exception:
+        return None
+    uid = _subject_id()
+    return None if uid is None else _lookup_identity(uid)
+
+
+def forget_identity(user_id):
+    _identities.pop(user_id)
+    for manager in list(_managers):
+        manager.forget_subject(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_user_ids", set())
+    for obj in session.deleted:
+        if isinstance(obj, User):
+            changed.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, User):
+            attrs = inspect(obj).attrs
+            if attrs.user_role.history.has_changes() or attrs.is_active.history.has_changes():
+                changed.add(obj.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _forget_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        forget_identity(user_id)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_changed_users(session, previous_transaction):
+    session.info.pop("changed_user_ids", None)
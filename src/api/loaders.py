@@ -0,0 +1,48 @@
+"""
+Named eager-loading profiles for Story queries.
+
+Story.serialize() reads `category` and `tags`, both lazy relationships, so every
+query whose rows end up serialized should go through one of these profiles.
+"""
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+from api.fields import field_columns, field_relations
+from api.models import db, Story
+
+# profile -> loader per relationship that Story.serialize() may read
+STORY_PROFILES = {
+    # Lists: one extra SELECT ... IN per relationship, whatever the page size.
+    "story_card": {
+        "category": selectinload,
+        "tags": selectinload,
+    },
+    # Single story: category rides along on the story row.
+    "story_detail": {
+        "category": joinedload,
+        "tags": selectinload,
+    },
+}
+
+
+def story_options(profile, fields=None):
+    """Loader options for a profile; with a ?fields= set only the columns and relationships it needs."""
+    try:
+        loaders = STORY_PROFILES[profile]
+    except KeyError:
+        raise ValueError(f"unknown story loader profile: {profile}")
+    if fields is None:
+        return tuple(loader(getattr(Story, rel)) for rel, loader in loaders.items())
+    wanted = field_relations(Story, fields)
+    return (load_only(*field_columns(Story, fields)),) + tuple(
+        loader(getattr(Story, rel)) for rel, loader in loaders.items() if rel in wanted
+    )
+
+
+def story_query(profile="story_card", fields=None):
+    return Story.query.options(*story_options(profile, fields))
+
+
+def load_story(story_id, profile="story_detail", fields=None):
+    # populate_existing: a story already in the session (e.g. expired by a commit) is reloaded
+    # with the profile's loaders instead of lazy-loading its relationships one by one
+    return db.session.get(Story, story_id, options=story_options(profile, fields), populate_existing=True)
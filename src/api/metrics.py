@@ -0,0 +1,127 @@
+"""
+Prometheus metrics.
+
+Records per-endpoint request counts, latency and response size histograms,
+how long requests wait to check a connection out of the SQLAlchemy pool, and
+lookups/hits of the result cache and of every named LRUCache. Under gunicorn,
+src/gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR (emptied when the master
+starts, dead workers marked on exit), so values go to one mmap file per
+worker and whichever worker answers a scrape reports the totals of all of
+them. Single-process runs (flask CLI, the dev server, uvicorn) leave it
+unset and keep the values in memory.
+
+The text exposition is served on /internal/metrics, only to clients on a
+private network that did not come through the public proxy, or to callers
+sending `Authorization: Bearer $METRICS_TOKEN`.
+"""
+import hmac
+import ipaddress
+import os
+import threading
+import time
+
+from flask import current_app, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from sqlalchemy.pool import QueuePool
+
+from api.cache import result_cache
+from api.utils import NAMED_CACHES
+
+REQUESTS = Counter(
+    "http_requests_total", "Requests handled", ["endpoint", "method", "status"])
+LATENCY = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request", ["endpoint", "method"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10))
+RESPONSE_SIZE = Histogram(
+    "http_response_size_bytes", "Response body size (streamed bodies are not counted)", ["endpoint"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304))
+POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30))
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total", "Cache lookups, hit ratio = hit / (hit + miss)", ["cache", "result"])
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = {}
+
+    def init_app(self, app):
+        """Must run before db.init_app so the engines are built with TimedQueuePool."""
+        app.config.setdefault("METRICS_TOKEN", os.getenv("METRICS_TOKEN"))
+        if ":memory:" not in app.config.get("SQLALCHEMY_DATABASE_URI", ""):
+            app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", {}).setdefault("poolclass", TimedQueuePool)
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.add_url_rule("/internal/metrics", "metrics", self.expose)
+
+    def _before(self):
+        g.metrics_started = time.perf_counter()
+
+    def _after(self, response):
+        started = g.get("metrics_started")
+        if started is None:
+            return response
+        endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+        if endpoint == "metrics":
+            return response
+        REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+        LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - started)
+        if not response.is_streamed:
+            RESPONSE_SIZE.labels(endpoint).observe(response.calculate_content_length() or 0)
+        self._sample_caches()
+        return response
+
+    def _sample_caches(self):
+        # caches keep their own running totals; export what changed since the last request
+        totals = {name: (cache.hits, cache.misses) for name, cache in NAMED_CACHES.items()}
+        for namespace, stats in result_cache.stats().items():
+            totals[f"result_{namespace}"] = (stats["hits"], stats["misses"])
+        with self._lock:
+            for name, (hits, misses) in totals.items():
+                seen_hits, seen_misses = self._seen.get(name, (0, 0))
+                if hits > seen_hits:
+                    CACHE_LOOKUPS.labels(name, "hit").inc(hits - seen_hits)
+                if misses > seen_misses:
+                    CACHE_LOOKUPS.labels(name, "miss").inc(misses - seen_misses)
+                self._seen[name] = (hits, misses)
+
+    def _allowed(self):
+        token = current_app.config["METRICS_TOKEN"]
+        if token:
+            supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+            return hmac.compare_digest(supplied, token)
+        if request.headers.get("X-Forwarded-For"):
+            return False
+        try:
+            addr = ipaddress.ip_address(request.remote_addr or "")
+        except ValueError:
+            return False
+        return addr.is_loopback or addr.is_private
+
+    def expose(self):
+        if not self._allowed():
+            return current_app.response_class("Not Found", status=404)
+        self._sample_caches()
+        registry = REGISTRY
+        if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        return current_app.response_class(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+metrics = Metrics()
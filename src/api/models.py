@@ -1,24 +1,26 @@
-import arrow
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import String, Boolean, Integer
+from sqlalchemy import String, Boolean, Integer, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.schema import CreateColumn
 from datetime import datetime, timezone
 from enum import Enum as PyEnum
 from sqlalchemy import func
 from typing import Optional, List
+from api.timefmt import TimeFormatter
+from api.fields import Field, column, enum_value, timestamp, humanized, serialize_fields
+from api.replicas import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
-def _iso(dt):
-    if not dt: 
+@compiles(CreateColumn)
+def _create_column(element, compiler, **kw):
+    # columns marked info={"postgresql_only": True} are left out of CREATE TABLE elsewhere
+    if element.element.info.get("postgresql_only") and compiler.dialect.name != "postgresql":
         return None
-    return arrow.get(dt).to('utc').format('YYYY-MM-DDTHH:mm:ss[Z]')
+    return compiler.visit_create_column(element, **kw)
 
-def _human(dt, locale='en'):
-    if not dt:
-        return None
-    return arrow.get(dt).humanize(locale=locale)
-    
 class UserRole(PyEnum):
     READER = "READER"
     WRITER = "WRITER"
@@ -54,6 +56,8 @@ class User(db.Model):
         server_default=UserRole.READER.value,
     )
     is_active: Mapped[bool] = mapped_column(Boolean(), nullable=False, default=True)
+    followers_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    following_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         db.DateTime(timezone=True), server_default=func.now(), nullable=False
     )
@@ -75,20 +79,23 @@ class User(db.Model):
         cascade="all",
     )
 
-    def serialize(self, locale:str='en'):
-        return {
-            "id": self.id,
-            "email": self.email,
-            "display_name": self.display_name,
-            "bio": self.bio,
-            "location": self.location,
-            "user_role": self.user_role.value,
-            "created_at": _iso(self.created_at),
-            "updated_at": _iso(self.updated_at),
-            "created_at_human": _human(self.created_at, locale), 
-            "updated_at_human": _human(self.updated_at, locale)
-
-        }
+    FIELDS = {
+        "id": column("id"),
+        "email": column("email"),
+        "display_name": column("display_name"),
+        "bio": column("bio"),
+        "location": column("location"),
+        "user_role": enum_value("user_role"),
+        "followers_count": column("followers_count", default=False),
+        "following_count": column("following_count", default=False),
+        "created_at": timestamp("created_at"),
+        "updated_at": timestamp("updated_at"),
+        "created_at_human": humanized("created_at"),
+        "updated_at_human": humanized("updated_at"),
+    }
+
+    def serialize(self, locale:str='en', fmt:Optional[TimeFormatter]=None, fields=None):
+        return serialize_fields(self, fmt or TimeFormatter(locale), fields)
 
 story_tag = db.Table(
     "story_tag",
@@ -120,6 +127,15 @@ class Story(db.Model):
     updated_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     deleted_at: Mapped[Optional[datetime]] = mapped_column(db.DateTime(timezone=True))
     category_id: Mapped[Optional[int]] = mapped_column(db.ForeignKey("category.id", ondelete="SET NULL"))
+    comments_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    views_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Full-text search document (api/search.py), Postgres only; SQLite uses the story_fts table.
+    # Part of the table but not of the mapper, so the ORM never selects, returns or writes it.
+    search_vector = db.Column(
+        TSVECTOR,
+        Computed("to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(synopsis, ''))", persisted=True),
+        info={"postgresql_only": True},
+    )
     category: Mapped[Optional["Category"]] = relationship(back_populates="stories")
     author: Mapped["User"] = relationship(back_populates="stories")
     chapters: Mapped[List["Chapter"]] = relationship(back_populates="story", cascade="all", order_by="Chapter.number")
@@ -128,31 +144,43 @@ class Story(db.Model):
 
     tags: Mapped[List["Tag"]] = relationship(secondary=story_tag, back_populates="stories")
 
-    def serialize(self, locale:str='en'):
-        return {
-            "id": self.id,
-            "author_id": self.author_id,
-            "title": self.title,
-            "synopsis": self.synopsis,
-            "status": self.status.value,
-            "published_at": _iso(self.published_at),
-            "created_at": _iso(self.created_at),
-            "updated_at": _iso(self.updated_at),
-            "deleted_at": _iso(self.deleted_at),
-            "created_at_human": _human(self.created_at, locale), 
-            "updated_at_human": _human(self.updated_at, locale),
-            "deleted_at_human": _human(self.deleted_at, locale),
-            "category": self.category.serialize() if self.category else None,
-            "cover_url": self.cover_url if self.cover_url else "",
-            "tags": [t.serialize() for t in self.tags],
-        }
+    __table_args__ = (
+        db.Index("ix_story_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+    )
+    __mapper_args__ = {"exclude_properties": ["search_vector"]}
+
+    FIELDS = {
+        "id": column("id"),
+        "author_id": column("author_id"),
+        "title": column("title"),
+        "synopsis": column("synopsis"),
+        "status": enum_value("status"),
+        "published_at": timestamp("published_at"),
+        "created_at": timestamp("created_at"),
+        "updated_at": timestamp("updated_at"),
+        "deleted_at": timestamp("deleted_at"),
+        "created_at_human": humanized("created_at"),
+        "updated_at_human": humanized("updated_at"),
+        "deleted_at_human": humanized("deleted_at"),
+        "category": Field(lambda s, fmt: s.category.serialize() if s.category else None,
+                          ("category_id",), relation="category"),
+        "cover_url": Field(lambda s, fmt: s.cover_url if s.cover_url else "", ("cover_url",)),
+        "tags": Field(lambda s, fmt: [t.serialize() for t in s.tags], relation="tags"),
+        # only in listings (see api/reads.py) or when asked for
+        "comments_count": column("comments_count", default=False),
+        "views_count": column("views_count", default=False),
+    }
+
+    def serialize(self, locale:str='en', fmt:Optional[TimeFormatter]=None, fields=None):
+        return serialize_fields(self, fmt or TimeFormatter(locale), fields)
 
 class Chapter(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     story_id: Mapped[int] = mapped_column(db.ForeignKey("story.id", ondelete="CASCADE"), nullable=False)
     title: Mapped[str] = mapped_column(String(200), nullable=False)
     number: Mapped[int] = mapped_column(Integer, nullable=False)
-    content: Mapped[str] = mapped_column(String(600), nullable=False)
+    # deferred: only get_chapter (and writes/exports that echo it) need the text
+    content: Mapped[str] = mapped_column(String(600), nullable=False, deferred=True)
     status: Mapped[ChapterStatus] = mapped_column(
         db.Enum(
             ChapterStatus,
@@ -173,22 +201,30 @@ class Chapter(db.Model):
     story: Mapped[Story] = relationship(back_populates="chapters")
     comments: Mapped[List["Comment"]] = relationship(back_populates="chapter", cascade="all")
 
-    def serialize(self, locale:str='en'):
-        return {
-            "id": self.id,
-            "story_id": self.story_id,
-            "title": self.title,
-            "number": self.number,
-            "content": self.content,
-            "status": self.status.value,
-            "published_at": _iso(self.published_at),
-            "created_at": _iso(self.created_at),
-            "updated_at": _iso(self.updated_at),
-            "deleted_at": _iso(self.deleted_at),
-            "created_at_human": _human(self.created_at, locale), 
-            "updated_at_human": _human(self.updated_at, locale),
-            "deleted_at_human": _human(self.deleted_at, locale),
-        }
+    FIELDS = {
+        "id": column("id"),
+        "story_id": column("story_id"),
+        "title": column("title"),
+        "number": column("number"),
+        "content": column("content"),
+        "status": enum_value("status"),
+        "published_at": timestamp("published_at"),
+        "created_at": timestamp("created_at"),
+        "updated_at": timestamp("updated_at"),
+        "deleted_at": timestamp("deleted_at"),
+        "created_at_human": humanized("created_at"),
+        "updated_at_human": humanized("updated_at"),
+        "deleted_at_human": humanized("deleted_at"),
+    }
+    # Table-of-contents entry used by chapter lists: everything but the text and deletion stamps
+    TOC_FIELDS = frozenset(("id", "story_id", "title", "number", "status", "published_at",
+                            "created_at", "updated_at", "created_at_human", "updated_at_human"))
+
+    def serialize(self, locale:str='en', fmt:Optional[TimeFormatter]=None, fields=None):
+        return serialize_fields(self, fmt or TimeFormatter(locale), fields)
+
+    def serialize_toc(self, locale:str='en', fmt:Optional[TimeFormatter]=None, fields=None):
+        return serialize_fields(self, fmt or TimeFormatter(locale), fields or self.TOC_FIELDS)
 
 class StoryView(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -202,6 +238,10 @@ class StoryView(db.Model):
     user: Mapped["User"] = relationship(back_populates="story_views")
     story: Mapped["Story"] = relationship(back_populates="views")
 
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "story_id", name="uq_story_view_user_story"),
+    )
+
     def serialize(self):
         return {
             "id": self.id,
@@ -210,6 +250,67 @@ class StoryView(db.Model):
             "view_count": self.view_count,
         }
 
+class StoryViewBatch(db.Model):
+    # One row per view-log batch already folded into story_view, so a replay after a crash is a no-op.
+    id: Mapped[str] = mapped_column(String(120), primary_key=True)
+    applied_at: Mapped[datetime] = mapped_column(
+        db.DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        db.Index("ix_story_view_batch_applied_at", "applied_at"),
+    )
+
+class StorySimilarity(db.Model):
+    # Precomputed "similar stories" neighbors, rebuilt by `flask build-similar` (see api/similar.py).
+    story_id: Mapped[int] = mapped_column(db.ForeignKey("story.id", ondelete="CASCADE"), primary_key=True)
+    rank: Mapped[int] = mapped_column(Integer, primary_key=True)
+    similar_id: Mapped[int] = mapped_column(db.ForeignKey("story.id", ondelete="CASCADE"), nullable=False)
+    score: Mapped[float] = mapped_column(db.Float, nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_story_similarity_similar_id", "similar_id"),
+    )
+
+class StoryTrending(db.Model):
+    # Time-decayed popularity of a published story, maintained by `flask recompute-trending` (see api/trending.py).
+    story_id: Mapped[int] = mapped_column(db.ForeignKey("story.id", ondelete="CASCADE"), primary_key=True)
+    score: Mapped[float] = mapped_column(db.Float, nullable=False)
+    # Story.views_count / comments_count already folded into score
+    views_seen: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    comments_seen: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    updated_at: Mapped[datetime] = mapped_column(
+        db.DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+
+    __table_args__ = (
+        db.Index("ix_story_trending_score", "score", "story_id"),
+    )
+
+class CacheVersion(db.Model):
+    # Result cache namespace versions, shared by every worker and CLI job (see api/cache.py).
+    namespace: Mapped[str] = mapped_column(String(40), primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+
+class FeedItem(db.Model):
+    # A published story or chapter pushed into a follower's home feed (see api/feed.py).
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
+    story_id: Mapped[int] = mapped_column(db.ForeignKey("story.id", ondelete="CASCADE"), nullable=False)
+    chapter_id: Mapped[Optional[int]] = mapped_column(db.ForeignKey("chapter.id", ondelete="CASCADE"))
+    author_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    published_at: Mapped[datetime] = mapped_column(db.DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        db.Index("ix_feed_item_user_published", "user_id", "published_at", "id"),
+        db.Index("ix_feed_item_story", "story_id"),
+        # one entry per story and per chapter in a user's feed, so re-publishing or pulling twice is a no-op
+        db.Index("uq_feed_item_user_story", "user_id", "story_id", unique=True,
+                 postgresql_where=db.text("chapter_id IS NULL"), sqlite_where=db.text("chapter_id IS NULL")),
+        db.Index("uq_feed_item_user_chapter", "user_id", "chapter_id", unique=True,
+                 postgresql_where=db.text("chapter_id IS NOT NULL"), sqlite_where=db.text("chapter_id IS NOT NULL")),
+    )
+
 class Comment(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(db.ForeignKey("user.id", ondelete="CASCADE"), nullable=False)
@@ -229,23 +330,31 @@ class Comment(db.Model):
     chapter: Mapped[Optional["Chapter"]] = relationship(back_populates="comments")
 
     __table_args__ = (
-        db.Index("ix_comment_story_chapter_created", "story_id", "chapter_id", "created_at"),
+        # listings walk these newest first on (created_at, id); soft-deleted comments are left out
+        db.Index("ix_comment_live_created", "created_at", "id",
+                 postgresql_where=db.text("deleted_at IS NULL"), sqlite_where=db.text("deleted_at IS NULL")),
+        db.Index("ix_comment_story_live_created", "story_id", "created_at", "id",
+                 postgresql_where=db.text("deleted_at IS NULL"), sqlite_where=db.text("deleted_at IS NULL")),
+        db.Index("ix_comment_story_chapter_created", "story_id", "chapter_id", "created_at", "id",
+                 postgresql_where=db.text("deleted_at IS NULL"), sqlite_where=db.text("deleted_at IS NULL")),
     )
 
-    def serialize(self, locale:str='en'):
-        return {
-            "id": self.id,
-            "user_id": self.user_id,
-            "story_id": self.story_id,
-            "chapter_id": self.chapter_id,
-            "text": self.text,
-            "created_at": _iso(self.created_at),
-            "updated_at": _iso(self.updated_at),
-            "deleted_at": _iso(self.deleted_at),
-            "created_at_human": _human(self.created_at, locale), 
-            "updated_at_human": _human(self.updated_at, locale),
-            "deleted_at_human": _human(self.deleted_at, locale),
-        }
+    FIELDS = {
+        "id": column("id"),
+        "user_id": column("user_id"),
+        "story_id": column("story_id"),
+        "chapter_id": column("chapter_id"),
+        "text": column("text"),
+        "created_at": timestamp("created_at"),
+        "updated_at": timestamp("updated_at"),
+        "deleted_at": timestamp("deleted_at"),
+        "created_at_human": humanized("created_at"),
+        "updated_at_human": humanized("updated_at"),
+        "deleted_at_human": humanized("deleted_at"),
+    }
+
+    def serialize(self, locale:str='en', fmt:Optional[TimeFormatter]=None, fields=None):
+        return serialize_fields(self, fmt or TimeFormatter(locale), fields)
 
 class Follower(db.Model):
     id: Mapped[int] = mapped_column(primary_key=True)
@@ -255,6 +364,13 @@ class Follower(db.Model):
     follower: Mapped["User"] = relationship(back_populates="following", foreign_keys=[follower_id])
     following: Mapped["User"] = relationship(back_populates="followers", foreign_keys=[following_id])
 
+    __table_args__ = (
+        # also answers "does A follow B" and "whom does A follow in this list" lookups
+        db.UniqueConstraint("follower_id", "following_id", name="uq_follower_pair"),
+        db.Index("ix_follower_follower_id_id", "follower_id", "id"),
+        db.Index("ix_follower_following_id_id", "following_id", "id"),
+    )
+
     def serialize(self):
         return {
             "id": self.id,
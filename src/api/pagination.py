@@ -0,0 +1,54 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Cursors are opaque url-safe tokens carrying the id of the last row of the
+previous page. The sort key of that anchor row is read back inside the same
+query, so comparisons happen on stored values and behave the same on Postgres
+and SQLite, and the planner can still walk the (sort column, id) index.
+"""
+import base64
+import json
+
+from sqlalchemy import and_, or_, select
+
+
+def encode_cursor(payload):
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Returns the decoded payload, or None when the token is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def after_anchor_desc(model, column, anchor_id, nulls_last=False, key=None):
+    """Filter for rows that follow `anchor_id` in ORDER BY column DESC, key DESC (key defaults to model.id)."""
+    key = model.id if key is None else key
+    anchor = select(column).where(key == anchor_id).scalar_subquery()
+    after = or_(column < anchor, and_(column == anchor, key < anchor_id))
+    if not nulls_last:
+        return after
+    return or_(
+        after,
+        and_(column.is_(None), or_(anchor.isnot(None), key < anchor_id)),
+    )
+
+
+def cursor_arg(args):
+    """Reads ?cursor= and returns (cursor_mode, anchor_id); anchor_id is False when malformed."""
+    if "cursor" not in args:
+        return False, None
+    token = (args.get("cursor") or "").strip()
+    if not token:
+        return True, None
+    payload = decode_cursor(token)
+    anchor_id = payload.get("id") if payload else None
+    if not isinstance(anchor_id, int):
+        return True, False
+    return True, anchor_id
@@ -0,0 +1,252 @@
+"""
+Statements and response shapes of the public read endpoints.
+
+Shared by the Flask views and the async read path (api/asyncapp.py) so both
+build the same SQL and return the same JSON. The story list helpers only use
+methods that legacy Query and select() have in common.
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import load_only, undefer
+
+from api.fields import default_fields, field_columns, parse_fields
+from api.loaders import story_options
+from api.models import User, Story, StoryStatus, StorySimilarity, StoryTrending, Category, Tag, Chapter, Comment, Follower
+from api.pagination import cursor_arg, encode_cursor, after_anchor_desc
+from api.search import apply_search
+from api.utils import LRUCache
+
+# Filtered story totals for ?total=cached, shared by every request in the worker.
+story_totals = LRUCache(maxsize=512, ttl=60, name="story_totals")
+
+# Story keys of a listing item when no ?fields= is given
+STORY_LIST_FIELDS = default_fields(Story) | {"comments_count", "views_count"}
+
+# User keys of the caller's own profile when no ?fields= is given; other user payloads
+# carry the follow counts only when asked for with ?fields=
+USER_PROFILE_FIELDS = default_fields(User) | {"followers_count", "following_count"}
+
+
+def fields_arg(args, model, allowed=None):
+    """?fields= for `model`; returns (frozenset or None, error code or None)."""
+    return parse_fields(args, allowed or frozenset(model.FIELDS))
+
+
+def story_list_args(args):
+    """Returns (params, error code); error is None when the query string is valid."""
+    cursor_mode, anchor_id = cursor_arg(args)
+    if anchor_id is False:
+        return None, "invalid_cursor"
+
+    # exact (default for page mode), cached (may lag writes by the cache TTL) or none
+    total_mode = (args.get("total") or ("none" if cursor_mode else "exact")).strip().lower()
+    if total_mode not in ("exact", "cached", "none"):
+        return None, "invalid_total"
+
+    # new (published_at) or trending (story_trending.score, see api/trending.py)
+    sort = (args.get("sort") or "new").strip().lower()
+    if sort not in ("new", "trending"):
+        return None, "invalid_sort"
+
+    fields, error = fields_arg(args, Story)
+    if error:
+        return None, error
+
+    return {
+        "page": max(int(args.get("page", 1)), 1),
+        "per_page": min(max(int(args.get("per_page", 10)), 1), 50),
+        "cursor_mode": cursor_mode,
+        "anchor_id": anchor_id,
+        "total_mode": total_mode,
+        "sort": sort,
+        "author_id": args.get("author_id", type=int),
+        "category_id": args.get("category_id", type=int),
+        "category_slug": (args.get("category_slug") or "").strip().lower(),
+        "tag_slug": (args.get("tag") or "").strip().lower(),
+        "query_str": (args.get("q") or "").strip(),
+        "fields": fields,
+    }, None
+
+
+def totals_key(params):
+    return tuple(params[k] for k in ("sort", "author_id", "category_id", "category_slug", "tag_slug", "query_str"))
+
+
+def filter_stories(q, params):
+    """Applies the listing filters to a Story query or select(); returns (q, relevance order or None)."""
+    if params["sort"] == "trending":
+        # only stories with a score; the job drops rows of unpublished stories
+        q = q.join(StoryTrending, StoryTrending.story_id == Story.id)
+
+    if params["author_id"] is not None:
+        q = q.filter_by(author_id=params["author_id"])
+
+    if params["category_id"] is not None:
+        q = q.filter_by(category_id=params["category_id"])
+
+    if params["category_slug"]:
+        q = q.join(Story.category).filter(Category.slug == params["category_slug"])
+
+    if params["tag_slug"]:
+        q = q.join(Story.tags).filter(Tag.slug == params["tag_slug"])
+
+    relevance = None
+    if params["query_str"]:
+        q, relevance = apply_search(q, params["query_str"])
+    return q, relevance
+
+
+def order_stories(q, params, relevance):
+    if params["sort"] == "trending":
+        # walks ix_story_trending_score backwards; search relevance does not apply here
+        q = q.order_by(StoryTrending.score.desc(), StoryTrending.story_id.desc())
+        if params["cursor_mode"] and params["anchor_id"] is not None:
+            q = q.filter(after_anchor_desc(StoryTrending, StoryTrending.score, params["anchor_id"],
+                                           key=StoryTrending.story_id))
+        return q
+
+    ordering = [Story.published_at.desc().nulls_last(), Story.id.desc()]
+    # Search results are ranked by relevance in page mode; cursors always walk (published_at, id).
+    if relevance is not None and not params["cursor_mode"]:
+        ordering.insert(0, relevance)
+    q = q.order_by(*ordering)
+    if params["cursor_mode"] and params["anchor_id"] is not None:
+        q = q.filter(after_anchor_desc(Story, Story.published_at, params["anchor_id"], nulls_last=True))
+    return q
+
+
+def story_list_body(params, items, fmt, total=None, has_more=False):
+    body = {
+        "items": [s.serialize(fmt=fmt, fields=params["fields"] or STORY_LIST_FIELDS) for s in items],
+        "per_page": params["per_page"],
+    }
+    if params["cursor_mode"]:
+        body["next_cursor"] = encode_cursor({"id": items[-1].id}) if has_more else None
+    else:
+        body["page"] = params["page"]
+    if params["total_mode"] != "none":
+        body["total"] = total
+    return body
+
+
+def similar_stmt(story_id, limit, fields=None):
+    """Precomputed neighbors that are still published, best first, as (Story, score) rows."""
+    return (select(Story, StorySimilarity.score)
+            .join(StorySimilarity, StorySimilarity.similar_id == Story.id)
+            .where(StorySimilarity.story_id == story_id, Story.status == StoryStatus.PUBLISHED)
+            .order_by(StorySimilarity.rank.asc())
+            .limit(limit)
+            .options(*story_options("story_card", fields)))
+
+
+def similar_body(rows, fmt, fields=None):
+    return {"items": [dict(s.serialize(fmt=fmt, fields=fields), score=score) for s, score in rows]}
+
+
+def chapters_stmt(story_id, fields=None):
+    """Table of contents: never reads chapter content. `fields` is a subset of Chapter.TOC_FIELDS."""
+    return (select(Chapter)
+            .options(load_only(*field_columns(Chapter, fields or Chapter.TOC_FIELDS, always=("id",))))
+            .filter_by(story_id=story_id)
+            .filter(Chapter.deleted_at.is_(None))
+            .order_by(Chapter.number.asc()))
+
+
+def chapter_stmt(story_id, chapter_id, fields=None):
+    """Content is only read when it is part of the response; the visibility columns always are."""
+    if fields is None:
+        option = undefer(Chapter.content)
+    else:
+        option = load_only(*field_columns(Chapter, fields, always=("id", "story_id", "status", "deleted_at")))
+    return select(Chapter).options(option).filter_by(id=chapter_id, story_id=story_id).limit(1)
+
+
+def comment_list_args(args):
+    """Returns (params, error code) for the comment lists; ?cursor= switches to keyset pages."""
+    cursor_mode, anchor_id = cursor_arg(args)
+    if anchor_id is False:
+        return None, "invalid_cursor"
+    fields, error = fields_arg(args, Comment)
+    if error:
+        return None, error
+    return {
+        "cursor_mode": cursor_mode,
+        "anchor_id": anchor_id,
+        "per_page": min(max(args.get("per_page", 50, type=int), 1), 100),
+        "fields": fields,
+    }, None
+
+
+def _comment_page(stmt, params):
+    """Live comments newest first on (created_at, id), the order of the ix_comment_*_created indexes."""
+    stmt = (stmt.filter(Comment.deleted_at.is_(None))
+            .order_by(Comment.created_at.desc(), Comment.id.desc()))
+    if params["fields"] is not None:
+        stmt = stmt.options(load_only(*field_columns(Comment, params["fields"], always=("id",))))
+    if not params["cursor_mode"]:
+        return stmt.limit(100)
+    if params["anchor_id"] is not None:
+        stmt = stmt.filter(after_anchor_desc(Comment, Comment.created_at, params["anchor_id"]))
+    return stmt.limit(params["per_page"] + 1)
+
+
+def comments_stmt(params, story_id=None):
+    stmt = select(Comment)
+    if story_id:
+        stmt = stmt.filter_by(story_id=story_id)
+    return _comment_page(stmt, params)
+
+
+def chapter_comments_stmt(story_id, chapter_id, params):
+    return _comment_page(select(Comment).filter_by(story_id=story_id, chapter_id=chapter_id), params)
+
+
+def comments_body(params, items, fmt):
+    if not params["cursor_mode"]:
+        return [c.serialize(fmt=fmt, fields=params["fields"]) for c in items]
+    return _cursor_page(params, items, lambda c: c.serialize(fmt=fmt, fields=params["fields"]))
+
+
+def follow_list_args(args):
+    """Returns (params, error code) for /follows; ?cursor= switches to keyset pages."""
+    cursor_mode, anchor_id = cursor_arg(args)
+    if anchor_id is False:
+        return None, "invalid_cursor"
+    return {
+        "cursor_mode": cursor_mode,
+        "anchor_id": anchor_id,
+        "per_page": min(max(args.get("per_page", 50, type=int), 1), 200),
+        "following_id": args.get("following_id", type=int),
+        "follower_id": args.get("follower_id", type=int),
+    }, None
+
+
+def follows_stmt(params):
+    """Newest follows first; each filter walks its (user column, id) index."""
+    stmt = select(Follower)
+    if params["following_id"] is not None:
+        stmt = stmt.filter_by(following_id=params["following_id"])
+    if params["follower_id"] is not None:
+        stmt = stmt.filter_by(follower_id=params["follower_id"])
+    if params["cursor_mode"]:
+        if params["anchor_id"] is not None:
+            stmt = stmt.filter(Follower.id < params["anchor_id"])
+        return stmt.order_by(Follower.id.desc()).limit(params["per_page"] + 1)
+    return stmt.order_by(Follower.id.desc()).limit(100)
+
+
+def follows_body(params, items):
+    if not params["cursor_mode"]:
+        return [f.serialize() for f in items]
+    return _cursor_page(params, items, lambda f: f.serialize())
+
+
+def _cursor_page(params, items, render):
+    """Keyset page body; `items` holds up to per_page + 1 rows, the extra one only signals more."""
+    per_page = params["per_page"]
+    has_more = len(items) > per_page
+    items = items[:per_page]
+    return {
+        "items": [render(item) for item in items],
+        "per_page": per_page,
+        "next_cursor": encode_cursor({"id": items[-1].id}) if has_more else None,
+    }
@@ -0,0 +1,108 @@
+"""
+Read-replica routing.
+
+DATABASE_REPLICA_URLS (comma separated) adds one bind per replica. Views
+decorated with @replica_reads send their SELECTs to one replica, picked at
+random per request; everything else, and any statement issued while
+flushing or after the request wrote, keeps using the primary.
+
+A request that writes sets a short-lived cookie, and for REPLICA_STICKY_SECONDS
+afterwards that client's replica reads go to the primary instead, so users
+see their own writes despite replication lag.
+
+Pool sizing, pre-ping and statement timeouts come from SQLALCHEMY_ENGINE_OPTIONS
+(see engine_options_from_env); replicas inherit the primary's options and can
+override them with the same variables prefixed DB_REPLICA_.
+"""
+import functools
+import os
+import random
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+STICKY_COOKIE = "db_wrote_at"
+
+
+def _int_env(name):
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def engine_options_from_env(url, prefix="DB_"):
+    """Engine options from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING and DB_STATEMENT_TIMEOUT_MS (Postgres only); unset ones are left out."""
+    options = {}
+    for key in ("pool_size", "max_overflow", "pool_timeout", "pool_recycle"):
+        value = _int_env(prefix + key.upper())
+        if value is not None:
+            options[key] = value
+    pre_ping = os.getenv(prefix + "POOL_PRE_PING")
+    if pre_ping:
+        options["pool_pre_ping"] = pre_ping != "0"
+    timeout_ms = _int_env(prefix + "STATEMENT_TIMEOUT_MS")
+    if timeout_ms is not None and url.startswith("postgresql"):
+        options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, "is_dml", False):
+                g.db_wrote = True
+            else:
+                replica = g.get("db_replica")
+                if replica is not None and not g.get("db_wrote") and getattr(clause, "is_select", False):
+                    g.db_replica_read = True
+                    return self._db.engines[replica]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class Replicas:
+    def __init__(self):
+        self.keys = []
+
+    def init_app(self, app):
+        """Adds the replica binds; must run before db.init_app."""
+        app.config.setdefault("DATABASE_REPLICA_URLS", os.getenv("DATABASE_REPLICA_URLS", ""))
+        app.config.setdefault("REPLICA_STICKY_SECONDS", int(os.getenv("REPLICA_STICKY_SECONDS", 5)))
+        urls = [u.strip().replace("postgres://", "postgresql://")
+                for u in app.config["DATABASE_REPLICA_URLS"].split(",") if u.strip()]
+        binds = app.config.setdefault("SQLALCHEMY_BINDS", {})
+        primary_options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        self.keys = []
+        for n, url in enumerate(urls, start=1):
+            key = f"replica_{n}"
+            options = dict(primary_options, **engine_options_from_env(url, prefix="DB_REPLICA_"))
+            binds[key] = dict(options, url=url)
+            self.keys.append(key)
+        app.after_request(self._mark_sticky)
+
+    def sticky(self):
+        try:
+            wrote_at = int(request.cookies.get(STICKY_COOKIE, ""))
+        except ValueError:
+            return False
+        return 0 <= time.time() - wrote_at < current_app.config["REPLICA_STICKY_SECONDS"]
+
+    def _mark_sticky(self, response):
+        if self.keys and g.get("db_wrote"):
+            window = current_app.config["REPLICA_STICKY_SECONDS"]
+            response.set_cookie(STICKY_COOKIE, str(int(time.time())), max_age=window,
+                                httponly=True, samesite="Lax")
+        return response
+
+
+replicas = Replicas()
+
+
+def replica_reads(view):
+    """Lets the view's SELECTs go to a read replica."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if replicas.keys and not replicas.sticky():
+            g.db_replica = random.choice(replicas.keys)
+        return view(*args, **kwargs)
+    return wrapper
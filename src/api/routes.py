@@ -1,30 +1,45 @@
 """
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
-from flask import Flask, request, jsonify, url_for, Blueprint
-from sqlalchemy import func, or_, and_
+from flask import Flask, Response, current_app, request, jsonify, url_for, Blueprint, stream_with_context
+from sqlalchemy import func, or_, and_, select
+from sqlalchemy.orm import load_only, undefer
 from api.models import (
-    db, User, Story, Chapter, Comment, Follower,
+    db, User, Story, Chapter, Comment,
     UserRole, StoryStatus, ChapterStatus, StoryView,
     Category, Tag
 )
 from api.utils import generate_sitemap, APIException
+from api.timefmt import TimeFormatter, request_formatter
+from api.fields import field_columns
+from api.loaders import story_query, load_story
+from api.sqlstats import query_budget
+from api.pagination import cursor_arg, encode_cursor
+from api.reads import (
+    story_list_args, filter_stories, order_stories, story_list_body, story_totals, totals_key,
+    chapters_stmt, chapter_stmt, comments_stmt, chapter_comments_stmt,
+    follow_list_args, follows_stmt, follows_body, similar_stmt, similar_body, fields_arg,
+    comment_list_args, comments_body, USER_PROFILE_FIELDS,
+)
+from api.counters import bump_story_counters
+from api.viewbuffer import view_buffer, story_exists
+from api.tags import MAX_TAG_LENGTH, slugify, set_story_tags, tag_story
+from api.cache import result_cache
+from api.replicas import replica_reads
+from api.identity import current_identity, current_identity_optional
+from api.export import iter_story_export, parse_watermark
+from api import feed
+from api.follows import follow_user, unfollow_user, followed_ids
+from api.similar import SIMILAR_TOP_K
 from flask_cors import CORS
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, verify_jwt_in_request
-import re
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 
 api = Blueprint('api', __name__)
 
 CORS(api)
 
-def _pick_locale() -> str:
-    loc = (request.args.get("locale") or "").strip()
-    if not loc:
-        al = (request.headers.get("Accept-Language") or "").split(",")[0]
-        loc = (al or "en").split("-")[0].strip().lower() or "en"
-    else:
-        loc = loc.split("-")[0].strip().lower()
-    return loc or "en"
+def _time_fmt() -> TimeFormatter:
+    return request_formatter(request)
 
 def get_current_user():
     uid = get_jwt_identity()
@@ -36,13 +51,6 @@ def get_current_user():
         pass
     return db.session.get(User, uid) if uid is not None else None
 
-def get_current_user_optional():
-    try:
-        verify_jwt_in_request(optional=True)
-    except Exception:
-        return None
-    return get_current_user()
-
 @api.route('/hello', methods=['POST', 'GET'])
 def handle_hello():
     response_body = {
@@ -50,25 +58,101 @@ def handle_hello():
     }
     return jsonify(response_body), 200
 
+@api.route('/cache/stats', methods=['GET'])
+@jwt_required()
+def cache_stats():
+    user = current_identity()
+    if not user or user.user_role != UserRole.ADMIN:
+        return jsonify({"error": "forbidden"}), 403
+    return jsonify(result_cache.stats()), 200
+
+@api.route('/export/stories', methods=['GET'])
+@jwt_required()
+def export_stories():
+    user = current_identity()
+    if not user or user.user_role != UserRole.ADMIN:
+        return jsonify({"error": "forbidden"}), 403
+    try:
+        since = parse_watermark(request.args.get("since"))
+    except ValueError:
+        return jsonify({"error": "invalid_since"}), 400
+    return Response(stream_with_context(iter_story_export(since)), mimetype="application/x-ndjson")
+
 @api.route('/user', methods=['GET'])
 def get_user():
-    loc = _pick_locale()
-    users = User.query.all()
-    return jsonify([user.serialize(locale=loc) for user in users]), 200
+    fmt = _time_fmt()
+    cursor_mode, anchor_id = cursor_arg(request.args)
+    if anchor_id is False:
+        return jsonify({"error": "invalid_cursor"}), 400
+    fields, error = fields_arg(request.args, User)
+    if error:
+        return jsonify({"error": error}), 400
+    columns = () if fields is None else (load_only(*field_columns(User, fields, always=("id",))),)
+
+    if cursor_mode:
+        per_page = min(max(request.args.get("per_page", 50, type=int), 1), 200)
+        q = User.query.options(*columns).order_by(User.id.asc())
+        if anchor_id is not None:
+            q = q.filter(User.id > anchor_id)
+        items = q.limit(per_page + 1).all()
+        has_more = len(items) > per_page
+        items = items[:per_page]
+        return jsonify({
+            "items": [u.serialize(fmt=fmt, fields=fields) for u in items],
+            "per_page": per_page,
+            "next_cursor": encode_cursor({"id": items[-1].id}) if has_more else None,
+        }), 200
+
+    # Without a cursor the whole directory is streamed as a JSON array, read through a
+    # server-side cursor in chunks so the worker never holds every user at once.
+    dumps = current_app.json.dumps
+
+    def generate():
+        rows = db.session.execute(
+            select(User).options(*columns).order_by(User.id.asc()).execution_options(yield_per=500)
+        ).scalars()
+        yield "["
+        for i, user in enumerate(rows):
+            yield ("," if i else "") + dumps(user.serialize(fmt=fmt, fields=fields))
+        yield "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
 
 @api.route('/user/me', methods=['GET'])
 @jwt_required()
 def get_me():
-    loc = _pick_locale()
+    fmt = _time_fmt()
+    fields, error = fields_arg(request.args, User)
+    if error:
+        return jsonify({"error": error}), 400
     user = get_current_user()
     if not user:
         return jsonify({"error": "unauthorized"}), 401
-    return jsonify(user.serialize(locale=loc)), 200
+    return jsonify(user.serialize(fmt=fmt, fields=fields or USER_PROFILE_FIELDS)), 200
+
+@api.route('/user/me/feed', methods=['GET'])
+@jwt_required()
+def my_feed():
+    fmt = _time_fmt()
+    user = current_identity()
+    _, anchor_id = cursor_arg(request.args)
+    if anchor_id is False:
+        return jsonify({"error": "invalid_cursor"}), 400
+    per_page = min(max(request.args.get("per_page", 20, type=int), 1), 50)
+
+    if anchor_id is None:
+        feed.refresh_feed(user.id)
+    items, has_more = feed.feed_page(user.id, anchor_id, per_page)
+    return jsonify({
+        "items": feed.serialize_feed(items, fmt),
+        "per_page": per_page,
+        "next_cursor": encode_cursor({"id": items[-1].id}) if has_more else None,
+    }), 200
 
 @api.route('/user/me', methods=['PATCH'])
 @jwt_required()
 def update_me():
-    loc = _pick_locale()
+    fmt = _time_fmt()
     user = get_current_user()
     if not user:
         return jsonify({"error": "unauthorized"}), 401
@@ -103,12 +187,12 @@ def update_me():
         user.location = loc_txt
 
     db.session.commit()
-    return jsonify(user.serialize(locale=loc)), 200
+    return jsonify(user.serialize(fmt=fmt, fields=USER_PROFILE_FIELDS)), 200
 
 
 @api.route('/auth/register', methods=['POST'])
 def register():
-    loc = _pick_locale()
+    fmt = _time_fmt()
     data = request.get_json() or {}
     email = (data.get("email") or "").strip().lower()
     password = data.get("password")
@@ -121,11 +205,11 @@ def register():
     new_user = User(email=email, password=pwd_hash, display_name=display_name)
     db.session.add(new_user)
     db.session.commit()
-    return jsonify(new_user.serialize(locale=loc)), 201
+    return jsonify(new_user.serialize(fmt=fmt)), 201
 
 @api.route('/auth/login', methods=['POST'])
 def login():
-    loc = _pick_locale()
+    fmt = _time_fmt()
     data = request.get_json() or {}
     email = (data.get("email") or "").strip().lower()
     password = data.get("password")
@@ -139,7 +223,7 @@ def login():
     return jsonify({
         "access_token": create_access_token(identity=str(new_user.id)),
         "refresh_token": create_refresh_token(identity=str(new_user.id)),
-        "user": new_user.serialize(locale=loc)
+        "user": new_user.serialize(fmt=fmt)
     }), 200
 
 @api.route('/categories', methods=['GET'])
@@ -150,7 +234,6 @@ def list_categories():
 @api.route('/categories', methods=['POST'])
 @jwt_required()
 def create_category():
-    user = get_current_user()
     data = request.get_json() or {}
     name = (data.get("name") or "").strip()
     slug = (data.get("slug") or "").strip().lower()
@@ -159,9 +242,7 @@ def create_category():
         return jsonify({"error": "missing_name"}), 400
 
     if not slug:
-        slug = name.strip().lower().replace(" ", "-")
-        slug = re.sub(r"[^a-z0-9-]+", "", slug)
-        slug = re.sub(r"-{2,}", "-", slug).strip("-")
+        slug = slugify(name)
 
     if not slug:
         return jsonify({"error": "missing_slug"}), 400
@@ -196,13 +277,16 @@ def create_tag():
         return jsonify({"error": "missing_name"}), 400
 
     if not slug:
-        slug = name.strip().lower().replace(" ", "-")
-        slug = re.sub(r"[^a-z0-9-]+", "", slug)
-        slug = re.sub(r"-{2,}", "-", slug).strip("-")
+        slug = slugify(name)
 
     if not slug:
         return jsonify({"error": "missing_slug"}), 400
 
+    if len(name) > MAX_TAG_LENGTH:
+        return jsonify({"error": "name_too_long"}), 400
+    if len(slug) > MAX_TAG_LENGTH:
+        return jsonify({"error": "slug_too_long"}), 400
+
     exists = Tag.query.filter(or_(Tag.name == name, Tag.slug == slug)).first()
     if exists:
         return jsonify(exists.serialize()), 200
@@ -213,10 +297,11 @@ def create_tag():
     return jsonify(tag.serialize()), 201
 
 @api.route('/stories', methods=['POST'])
+@query_budget(10)  # includes the cache_version bump of the in-process result cache
 @jwt_required()
 def create_story():
-    loc = _pick_locale()
-    user = get_current_user()
+    fmt = _time_fmt()
+    user = current_identity()
     if not user:
         return jsonify({"error": "unauthorized"}), 401
 
@@ -238,113 +323,92 @@ def create_story():
         except (TypeError, ValueError):
             return jsonify({"error": "invalid_category_id"}), 422
 
-    if isinstance(in_tags, list):
-        tags_objs = []
-        for raw in in_tags:
-            name = str(raw or "").strip()
-            if not name:
-                continue
-            s = name.strip().lower().replace(" ", "-")
-            s = re.sub(r"[^a-z0-9-]+", "", s)
-            s = re.sub(r"-{2,}", "-", s).strip("-")
-            existing = Tag.query.filter(or_(Tag.slug == s, Tag.name.ilike(name))).first()
-            if existing:
-                tags_objs.append(existing)
-            else:
-                t = Tag(name=name, slug=s)
-                db.session.add(t)
-                db.session.flush()
-                tags_objs.append(t)
-        new_story.tags = tags_objs
-
     db.session.add(new_story)
+    if isinstance(in_tags, list):
+        try:
+            tag_story(new_story, in_tags)
+        except ValueError:
+            return jsonify({"error": "tag_too_long"}), 400
+    db.session.flush()
+    story_id = new_story.id  # read before the commit expires it, saving a refresh SELECT
     db.session.commit()
-    return jsonify(new_story.serialize(locale=loc)), 201
+    new_story = load_story(story_id)
+    return jsonify(new_story.serialize(fmt=fmt)), 201
 
 @api.route('/stories', methods=['GET'])
+@replica_reads
+@result_cache.cached("stories")
+@query_budget(4)
 def list_stories():
-    loc = _pick_locale()
-    page = max(int(request.args.get("page", 1)), 1)
-    per_page = min(max(int(request.args.get("per_page", 10)), 1), 50)
-
-    author_id = request.args.get("author_id", type=int)
-    category_id = request.args.get("category_id", type=int)
-    category_slug = (request.args.get("category_slug") or "").strip().lower()
-    tag_slug = (request.args.get("tag") or "").strip().lower()
-    query_str = (request.args.get("q") or "").strip()
-
-    q = Story.query
-
-    if author_id is not None:
-        q = q.filter_by(author_id=author_id)
-
-    if category_id is not None:
-        q = q.filter_by(category_id=category_id)
-
-    if category_slug:
-        q = q.join(Story.category).filter(Category.slug == category_slug)
-
-    if tag_slug:
-        q = q.join(Story.tags).filter(Tag.slug == tag_slug)
-
-    if query_str:
-        like = f"%{query_str}%"
-        q = q.filter(or_(
-            Story.title.ilike(like),
-            Story.synopsis.ilike(like)
-        ))
-
-    list_order = q.order_by(Story.published_at.desc().nulls_last(), Story.id.desc())
-    pag = list_order.paginate(page=page, per_page=per_page, error_out=False)
-
-    story_ids = [s.id for s in pag.items]
-
-    if story_ids:
-        comment_counts = dict(
-            db.session.query(Comment.story_id, func.count(Comment.id))
-            .filter(Comment.story_id.in_(story_ids), Comment.deleted_at.is_(None))
-            .group_by(Comment.story_id)
-            .all()
-        )
-        view_counts = dict(
-            db.session.query(StoryView.story_id, func.coalesce(func.sum(StoryView.view_count), 0))
-            .filter(StoryView.story_id.in_(story_ids))
-            .group_by(StoryView.story_id)
-            .all()
-        )
+    fmt = _time_fmt()
+    params, error = story_list_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    q, relevance = filter_stories(story_query("story_card", params["fields"]), params)
+
+    total = None
+    if params["total_mode"] == "cached":
+        key = totals_key(params)
+        total = story_totals.get(key)
+        if total is None:
+            total = q.order_by(None).count()
+            story_totals.set(key, total)
+
+    list_order = order_stories(q, params, relevance)
+    has_more = False
+    if params["cursor_mode"]:
+        if params["total_mode"] == "exact":
+            total = q.order_by(None).count()
+        per_page = params["per_page"]
+        items = list_order.limit(per_page + 1).all()
+        has_more = len(items) > per_page
+        items = items[:per_page]
     else:
-        comment_counts = {}
-        view_counts = {}
+        pag = list_order.paginate(page=params["page"], per_page=params["per_page"], error_out=False,
+                                  count=(params["total_mode"] == "exact"))
+        items = pag.items
+        if params["total_mode"] == "exact":
+            total = pag.total
 
-    return jsonify({
-        "items": [
-            dict(
-                s.serialize(locale=loc),
-                comments_count=int(comment_counts.get(s.id, 0) or 0),
-                views_count=int(view_counts.get(s.id, 0) or 0),
-            )
-            for s in pag.items
-        ],
-        "page": pag.page,
-        "per_page": pag.per_page,
-        "total": pag.total
-    })
+    return jsonify(story_list_body(params, items, fmt, total, has_more))
 
 @api.route('/stories/<int:story_id>', methods=['GET'])
+@replica_reads
+@query_budget(2)
 def get_story(story_id: int):
-    loc = _pick_locale()
-    stories = db.session.get(Story, story_id)
+    fmt = _time_fmt()
+    fields, error = fields_arg(request.args, Story)
+    if error:
+        return jsonify({"error": error}), 400
+    stories = load_story(story_id, fields=fields)
     if not stories:
         return jsonify({"error": "not_found"}), 404
-    return jsonify(stories.serialize(locale=loc))
+    return jsonify(stories.serialize(fmt=fmt, fields=fields))
+
+@api.route('/stories/<int:story_id>/similar', methods=['GET'])
+@replica_reads
+@result_cache.cached("stories")
+@query_budget(3)
+def similar_stories(story_id: int):
+    fmt = _time_fmt()
+    limit = min(max(request.args.get("limit", 10, type=int), 1), SIMILAR_TOP_K)
+    fields, error = fields_arg(request.args, Story)
+    if error:
+        return jsonify({"error": error}), 400
+    rows = db.session.execute(similar_stmt(story_id, limit, fields)).all()
+    if not rows and db.session.get(Story, story_id) is None:
+        return jsonify({"error": "not_found"}), 404
+    return jsonify(similar_body(rows, fmt, fields))
 
 # We use patch in order to partially update the record, PUT completely overrides the record.
 @api.route('/stories/<int:story_id>', methods=['PATCH'])
+@query_budget(12)  # publishing with new tags: tag lookup/insert, relink, feed fan-out, cache_version bump
 @jwt_required()
 def update_story(story_id: int):
-    loc = _pick_locale()
-    user = get_current_user()
-    stories_update = db.session.get(Story, story_id)
+    fmt = _time_fmt()
+    user = current_identity()
+    stories_update = load_story(story_id)
     if not stories_update:
         return jsonify({"error": "not_found"}), 404
     if stories_update.author_id != user.id:
@@ -387,36 +451,31 @@ def update_story(story_id: int):
     if "tags" in data:
         in_tags = data.get("tags")
         if in_tags is None:
-            stories_update.tags = []
+            set_story_tags(stories_update, [])
         elif isinstance(in_tags, list):
-            tags_objs = []
-            for raw in in_tags:
-                name = str(raw or "").strip()
-                if not name:
-                    continue
-                s = name.strip().lower().replace(" ", "-")
-                s = re.sub(r"[^a-z0-9-]+", "", s)
-                s = re.sub(r"-{2,}", "-", s).strip("-")
-                existing = Tag.query.filter(or_(Tag.slug == s, Tag.name.ilike(name))).first()
-                if existing:
-                    tags_objs.append(existing)
-                else:
-                    t = Tag(name=name, slug=s)
-                    db.session.add(t)
-                    db.session.flush()
-                    tags_objs.append(t)
-            stories_update.tags = tags_objs
+            try:
+                tag_story(stories_update, in_tags)
+            except ValueError:
+                return jsonify({"error": "tag_too_long"}), 400
         else:
             return jsonify({"error": "invalid_tags"}), 422
 
+    if "status" in data and data["status"] is not None and old_status != new_status:
+        if new_status == StoryStatus.PUBLISHED:
+            db.session.flush()
+            feed.fan_out_story(stories_update)
+        elif old_status == StoryStatus.PUBLISHED:
+            feed.retract(story_id=story_id)
+
     db.session.commit()
-    return jsonify(stories_update.serialize(locale=loc)), 200
+    stories_update = load_story(story_id)
+    return jsonify(stories_update.serialize(fmt=fmt)), 200
 
 @api.route('/stories/<int:story_id>/chapters', methods=['POST'])
 @jwt_required()
 def create_chapter(story_id: int):
-    loc = _pick_locale()
-    user = get_current_user()
+    fmt = _time_fmt()
+    user = current_identity()
     stories = db.session.get(Story, story_id)
     if not stories:
         return jsonify({"error": "not_found"}), 404
@@ -440,14 +499,22 @@ def create_chapter(story_id: int):
             return jsonify({"error": "invalid_status"}), 422
 
     new_chapter = Chapter(story_id=story_id, title=title, number=int(number), content=content, status=new_status)
+    if new_status == ChapterStatus.PUBLISHED:
+        new_chapter.published_at = func.now()
     db.session.add(new_chapter)
+    db.session.flush()
+    if new_status == ChapterStatus.PUBLISHED:
+        feed.fan_out_chapter(new_chapter, stories)
+    chapter_id = new_chapter.id
     db.session.commit()
-    return jsonify(new_chapter.serialize(locale=loc)), 201
+    # one SELECT reloads the expired row together with the deferred content
+    new_chapter = db.session.scalars(chapter_stmt(story_id, chapter_id)).one()
+    return jsonify(new_chapter.serialize(fmt=fmt)), 201
 
 @api.route('/stories/<int:story_id>/chapters/<int:chapter_id>', methods=['DELETE'])
 @jwt_required()
 def delete_chapter(story_id: int, chapter_id: int):
-    user = get_current_user()
+    user = current_identity()
     chapter_delete = Chapter.query.filter_by(id=chapter_id, story_id=story_id).first()
     if not chapter_delete or chapter_delete.deleted_at is not None:
         return jsonify({"error": "not_found"}), 404
@@ -458,58 +525,72 @@ def delete_chapter(story_id: int, chapter_id: int):
     hard = (request.args.get("hard", "false").lower() == "true")
 
     if hard:
+        live_comments = (Comment.query
+                         .filter_by(chapter_id=chapter_id)
+                         .filter(Comment.deleted_at.is_(None))
+                         .count())
+        if live_comments:
+            bump_story_counters(story_id, comments=-live_comments)
         db.session.delete(chapter_delete)
     else:
         chapter_delete.deleted_at = func.now()
         chapter_delete.status = ChapterStatus.DELETED
 
+    feed.retract(chapter_id=chapter_id)
     db.session.commit()
     return "", 204
 
 @api.route("/stories/<int:story_id>/chapters", methods=["GET"])
+@replica_reads
+@query_budget(1)
 def list_chapters(story_id: int):
-    loc = _pick_locale()
-    items = (Chapter.query
-             .filter_by(story_id=story_id)
-             .filter(Chapter.deleted_at.is_(None))
-             .order_by(Chapter.number.asc())
-             .all())
-    return jsonify([c.serialize(locale=loc) for c in items])
+    fmt = _time_fmt()
+    fields, error = fields_arg(request.args, Chapter, Chapter.TOC_FIELDS)
+    if error:
+        return jsonify({"error": error}), 400
+    items = db.session.scalars(chapters_stmt(story_id, fields)).all()
+    return jsonify([c.serialize_toc(fmt=fmt, fields=fields) for c in items])
 
 @api.route("/user/me/recent-stories", methods=["GET"])
 @jwt_required()
 def recent_stories():
-    user = get_current_user()
+    user = current_identity()
     viewed = (StoryView.query.filter_by(user_id=user.id).order_by(StoryView.last_viewed_at.desc()).limit(5))
     return jsonify([sv.serialize() for sv in viewed.all()]), 200
 
 @api.route('/stories/<int:story_id>/chapters/<int:chapter_id>', methods=['GET'])
 def get_chapter(story_id: int, chapter_id: int):
-    loc = _pick_locale()
-    c = Chapter.query.filter_by(id=chapter_id, story_id=story_id).first()
+    fmt = _time_fmt()
+    fields, error = fields_arg(request.args, Chapter)
+    if error:
+        return jsonify({"error": error}), 400
+    c = db.session.scalars(chapter_stmt(story_id, chapter_id, fields)).first()
     if not c or c.deleted_at is not None:
         return jsonify({"error": "not_found"}), 404
 
     if c.status != ChapterStatus.PUBLISHED:
-        user = get_current_user_optional()
+        user = current_identity_optional()
         if not user or (user.id != c.story.author_id and user.user_role != UserRole.ADMIN):
             return jsonify({"error": "forbidden"}), 403
 
-    return jsonify(c.serialize(locale=loc)), 200
+    return jsonify(c.serialize(fmt=fmt, fields=fields)), 200
 
 @api.route('/stories/<int:story_id>/chapters/<int:chapter_id>', methods=['PATCH'])
 @jwt_required()
 def update_chapter(story_id: int, chapter_id: int):
-    loc = _pick_locale()
-    user = get_current_user()
-    c = Chapter.query.filter_by(id=chapter_id, story_id=story_id).first()
+    fmt = _time_fmt()
+    user = current_identity()
+    data = request.get_json() or {}
+    q = Chapter.query.filter_by(id=chapter_id, story_id=story_id)
+    if data.get("content") is not None:
+        # compare against the stored text so an unchanged body is not rewritten
+        q = q.options(undefer(Chapter.content))
+    c = q.first()
     if not c or c.deleted_at is not None:
         return jsonify({"error": "not_found"}), 404
     if c.story.author_id != user.id and user.user_role != UserRole.ADMIN:
         return jsonify({"error": "forbidden"}), 403
 
-    data = request.get_json() or {}
-
     if "title" in data and data["title"] is not None:
         title = (data.get("title") or "").strip()
         if not title:
@@ -541,36 +622,34 @@ def update_chapter(story_id: int, chapter_id: int):
 
         if old_status != ChapterStatus.PUBLISHED and new_status == ChapterStatus.PUBLISHED:
             c.published_at = func.now()
+            db.session.flush()
+            feed.fan_out_chapter(c, c.story)
         elif new_status != ChapterStatus.PUBLISHED:
             c.published_at = None
+            feed.retract(chapter_id=chapter_id)
 
     db.session.commit()
-    return jsonify(c.serialize(locale=loc)), 200
+    c = db.session.scalars(chapter_stmt(story_id, chapter_id)).one()
+    return jsonify(c.serialize(fmt=fmt)), 200
 
 @api.route("/stories/<int:story_id>/view", methods=["POST"])
 @jwt_required()
 def mark_view(story_id: int):
-    user = get_current_user()
-    viewed = db.session.get(Story, story_id)
-    if not viewed:
+    # Acknowledged straight away; the view is folded into story_view by the write-behind flusher.
+    try:
+        user_id = int(get_jwt_identity())
+    except (TypeError, ValueError):
+        return jsonify({"error": "unauthorized"}), 401
+    if not story_exists(story_id):
         return jsonify({"error": "not_found"}), 404
-
-    sv = StoryView.query.filter_by(user_id=user.id, story_id=story_id).first()
-    if sv:
-        sv.last_viewed_at = func.now()
-        sv.view_count = sv.view_count + 1
-    else:
-        sv = StoryView(user_id=user.id, story_id=story_id)
-        db.session.add(sv)
-
-    db.session.commit()
-    return jsonify(sv.serialize()), 200
+    view_buffer.record(user_id, story_id)
+    return jsonify({"user_id": user_id, "story_id": story_id, "queued": True}), 202
 
 @api.route("/comments", methods=["POST"])
 @jwt_required()
 def create_comment():
-    loc = _pick_locale()
-    user = get_current_user()
+    fmt = _time_fmt()
+    user = current_identity()
     data = request.get_json() or {}
     story_id = data.get("story_id")
     text = (data.get("text") or "").strip()
@@ -581,34 +660,57 @@ def create_comment():
 
     new_comment = Comment(user_id=user.id, story_id=int(story_id), text=text)
     db.session.add(new_comment)
+    bump_story_counters(new_comment.story_id, comments=1)
     db.session.commit()
-    return jsonify(new_comment.serialize(locale=loc)), 201
+    return jsonify(new_comment.serialize(fmt=fmt)), 201
 
 @api.route("/comments", methods=["GET"])
+@replica_reads
 def list_comments():
-    loc = _pick_locale()
+    fmt = _time_fmt()
     story_id = request.args.get("story_id", type=int)
-    comment_list = Comment.query
-    if story_id:
-        comment_list = comment_list.filter_by(story_id=story_id)
-    comment_list = comment_list.order_by(Comment.created_at.desc())
-    return jsonify([c.serialize(locale=loc) for c in comment_list.limit(100).all()])
+    params, error = comment_list_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    items = db.session.scalars(comments_stmt(params, story_id)).all()
+    return jsonify(comments_body(params, items, fmt))
+
+@api.route("/comments/<int:comment_id>", methods=["DELETE"])
+@jwt_required()
+def delete_comment(comment_id: int):
+    user = current_identity()
+    c = db.session.get(Comment, comment_id)
+    if not c or c.deleted_at is not None:
+        return jsonify({"error": "not_found"}), 404
+    if c.user_id != user.id and user.user_role != UserRole.ADMIN:
+        return jsonify({"error": "forbidden"}), 403
+
+    hard = (request.args.get("hard", "false").lower() == "true")
+
+    if hard:
+        db.session.delete(c)
+    else:
+        c.deleted_at = func.now()
+    bump_story_counters(c.story_id, comments=-1)
+
+    db.session.commit()
+    return "", 204
 
 @api.route('/stories/<int:story_id>/chapters/<int:chapter_id>/comments', methods=['GET'])
+@replica_reads
 def list_chapter_comments(story_id: int, chapter_id: int):
-    loc = _pick_locale()
-    items = (Comment.query
-             .filter_by(story_id=story_id, chapter_id=chapter_id)
-             .order_by(Comment.created_at.desc())
-             .limit(100)
-             .all())
-    return jsonify([c.serialize(locale=loc) for c in items]), 200
+    fmt = _time_fmt()
+    params, error = comment_list_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    items = db.session.scalars(chapter_comments_stmt(story_id, chapter_id, params)).all()
+    return jsonify(comments_body(params, items, fmt)), 200
 
 @api.route('/stories/<int:story_id>/chapters/<int:chapter_id>/comments', methods=['POST'])
 @jwt_required()
 def create_chapter_comment(story_id: int, chapter_id: int):
-    loc = _pick_locale()
-    user = get_current_user()
+    fmt = _time_fmt()
+    user = current_identity()
     ch = Chapter.query.filter_by(id=chapter_id, story_id=story_id).first()
     if not ch or ch.deleted_at is not None:
         return jsonify({"error": "not_found"}), 404
@@ -627,50 +729,58 @@ def create_chapter_comment(story_id: int, chapter_id: int):
         text=text
     )
     db.session.add(new_comment)
+    bump_story_counters(story_id, comments=1)
     db.session.commit()
-    return jsonify(new_comment.serialize(locale=loc)), 201
+    return jsonify(new_comment.serialize(fmt=fmt)), 201
 
 @api.route("/follows", methods=["GET"])
 def list_follows():
-    following_id = request.args.get("following_id", type=int)
-    follower_id = request.args.get("follower_id", type=int)
+    params, error = follow_list_args(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+    items = db.session.scalars(follows_stmt(params)).all()
+    return jsonify(follows_body(params, items)), 200
 
-    q = Follower.query
-    if following_id is not None:
-        q = q.filter_by(following_id=following_id)
-    if follower_id is not None:
-        q = q.filter_by(follower_id=follower_id)
-
-    q = q.order_by(Follower.id.desc())
-    items = q.limit(100).all()
-
-    return jsonify([f.serialize() for f in items]), 200
+@api.route("/follows/check", methods=["GET"])
+@jwt_required()
+def check_follows():
+    user = current_identity()
+    try:
+        user_ids = [int(v) for v in (request.args.get("user_ids") or "").split(",") if v.strip()]
+    except ValueError:
+        return jsonify({"error": "invalid_user_ids"}), 400
+    if not user_ids or len(user_ids) > 200:
+        return jsonify({"error": "invalid_user_ids"}), 400
+    followed = followed_ids(user.id, user_ids)
+    return jsonify({"following": {str(uid): uid in followed for uid in user_ids}}), 200
 
 @api.route("/follows", methods=["POST"])
 @jwt_required()
 def follow():
-    user = get_current_user()
+    user = current_identity()
     data = request.get_json() or {}
-    following_id = data.get("following_id")
-    if not following_id or int(following_id) == user.id:
+    try:
+        following_id = int(data.get("following_id") or 0)
+    except (TypeError, ValueError):
+        following_id = 0
+    if not following_id or following_id == user.id:
         return jsonify({"error": "invalid_follow"}), 400
 
-    new_follower = Follower(follower_id=user.id, following_id=int(following_id))
-    db.session.add(new_follower)
+    edge, created = follow_user(user.id, following_id)
+    if edge is None:
+        return jsonify({"error": "not_found"}), 404
     db.session.commit()
-    return jsonify(new_follower.serialize()), 201
+    return jsonify(edge.serialize()), 201 if created else 200
 
 @api.route("/follows", methods=["DELETE"])
 @jwt_required()
 def unfollow():
-    user = get_current_user()
+    user = current_identity()
     following_id = request.args.get("following_id", type=int)
     if not following_id:
         return jsonify({"error": "missing_following_id"}), 400
 
-    unfollow = Follower.query.filter_by(follower_id=user.id, following_id=following_id).first()
-    if not unfollow:
+    if not unfollow_user(user.id, following_id):
         return jsonify({"error": "not_found"}), 404
-    db.session.delete(unfollow)
     db.session.commit()
     return "", 204
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Full-text search over story titles and synopses.
+
+Postgres keeps a generated `story.search_vector` tsvector column behind a GIN
+index, both declared on Story (Postgres only); SQLite keeps an FTS5 table
+`story_fts` (rowid = story.id) in sync with triggers. Both are created by the
+migrations; on SQLite the table and triggers are also emitted right after the
+story table by db.create_all(), and `flask reindex-search` builds or rebuilds
+them on an existing database. Request handlers never run DDL.
+Every search term is matched as a prefix and all terms must match.
+"""
+import re
+
+from sqlalchemy import DDL, Integer, column, event, false, func, literal_column, select, table, text
+
+from api.models import db, Story
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+_story_fts = table("story_fts", column("rowid", Integer), column("rank"))
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS story_fts USING fts5(title, synopsis)",
+    """CREATE TRIGGER IF NOT EXISTS story_fts_ai AFTER INSERT ON story BEGIN
+        INSERT INTO story_fts(rowid, title, synopsis) VALUES (new.id, new.title, new.synopsis);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS story_fts_au AFTER UPDATE OF title, synopsis ON story BEGIN
+        DELETE FROM story_fts WHERE rowid = old.id;
+        INSERT INTO story_fts(rowid, title, synopsis) VALUES (new.id, new.title, new.synopsis);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS story_fts_ad AFTER DELETE ON story BEGIN
+        DELETE FROM story_fts WHERE rowid = old.id;
+    END""",
+)
+
+for _ddl in SQLITE_DDL:
+    event.listen(Story.__table__, "after_create", DDL(_ddl).execute_if(dialect="sqlite"))
+event.listen(Story.__table__, "after_drop", DDL("DROP TABLE IF EXISTS story_fts").execute_if(dialect="sqlite"))
+
+
+def _terms(query_str):
+    return [t.lower() for t in _TERM_RE.findall(query_str)][:16]
+
+
+def ensure_sqlite_index(rebuild=False):
+    """Creates the FTS table and triggers if missing; fills the table when new or when `rebuild`."""
+    with db.engine.begin() as conn:
+        exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'story_fts'"
+        )).first()
+        for ddl in SQLITE_DDL:
+            conn.execute(text(ddl))
+        if rebuild or not exists:
+            conn.execute(text("DELETE FROM story_fts"))
+            conn.execute(text(
+                "INSERT INTO story_fts(rowid, title, synopsis) SELECT id, title, synopsis FROM story"
+            ))
+
+
+def apply_search(query, query_str):
+    """Filters a Story query by `query_str`; returns (query, relevance order clause or None)."""
+    terms = _terms(query_str)
+    if not terms:
+        return query.filter(false()), None
+
+    dialect = db.engine.dialect.name
+    if dialect == "postgresql":
+        vector = Story.__table__.c.search_vector
+        tsq = func.to_tsquery("simple", " & ".join(f"{t}:*" for t in terms))
+        return query.filter(vector.op("@@")(tsq)), func.ts_rank_cd(vector, tsq).desc()
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{t}"*' for t in terms)
+        hits = (select(_story_fts.c.rowid.label("story_id"), _story_fts.c.rank.label("rank"))
+                .where(literal_column("story_fts").op("MATCH")(match))
+                .subquery())
+        return query.join(hits, hits.c.story_id == Story.id), hits.c.rank.asc()
+
+    like = f"%{query_str}%"
+    return query.filter(Story.title.ilike(like) | Story.synopsis.ilike(like)), None
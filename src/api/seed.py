@@ -0,0 +1,276 @@
+"""
+Synthetic dataset generator used by `flask insert-test-data`.
+
+Rows are generated in fixed-size chunks by a process pool. Every chunk has its
+own RNG seeded from (seed, table, chunk number), and every id is derived from
+row indexes rather than from insertion order, so the same --seed and --until
+always produce the same data whatever the number of workers. Popularity is
+skewed: a few authors own most stories, and a few stories and authors collect
+most views, comments and followers.
+
+Rows are loaded in large batches: COPY ... FROM STDIN on Postgres (psycopg2),
+multi-row INSERTs elsewhere. Sequences are moved past the explicit ids at the
+end and the denormalized story counters are recomputed.
+"""
+import csv
+import io
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, text
+
+from api.models import db, User, Story, Chapter, Comment, Follower, StoryView, Category, Tag
+from api.counters import recount_story_counters, recount_follow_counters
+
+CHUNK = 5000
+MAX_CHAPTERS = 12
+
+_WORDS = (
+    "dragon shadow river crown ember winter glass forgotten silver storm oath "
+    "garden wolf lantern tide hollow iron whisper star orchard ash raven "
+    "harbor thorn echo mirror north ember veil kingdom song"
+).split()
+_CATEGORIES = ("Fantasy", "Romance", "Mystery", "Science Fiction", "Horror", "Adventure", "Poetry", "Drama")
+
+COLUMNS = {
+    "user": ("id", "email", "password", "display_name", "bio", "location", "user_role", "is_active", "created_at", "updated_at"),
+    "tag": ("id", "name", "slug"),
+    "story": ("id", "author_id", "title", "synopsis", "status", "published_at", "created_at", "updated_at", "deleted_at", "category_id"),
+    "story_tag": ("story_id", "tag_id"),
+    "chapter": ("id", "story_id", "title", "number", "content", "status", "published_at", "created_at", "updated_at"),
+    "follower": ("id", "follower_id", "following_id"),
+    "story_view": ("id", "user_id", "story_id", "view_count", "last_viewed_at"),
+    "comment": ("id", "user_id", "story_id", "chapter_id", "text", "created_at", "updated_at"),
+}
+
+
+def skewed(rng, n, a=2.5):
+    """Index in [0, n) where low indexes are far more likely (power-law-like)."""
+    return min(n - 1, int(n * rng.random() ** a))
+
+
+def chapters_for(params, story_index):
+    # cheap deterministic hash, so any worker can tell how many chapters a story has
+    h = (story_index * 2654435761 + params["seed"]) & 0xFFFFFFFF
+    return 1 + h % min(MAX_CHAPTERS, 2 * params["chapters_per_story"])
+
+
+def chapter_id(params, story_index, number):
+    # fixed id slots per story; unused slots just leave gaps in the sequence
+    return params["base"]["chapter"] + story_index * MAX_CHAPTERS + number - 1
+
+
+def _sentence(rng, lo, hi, limit):
+    words = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(lo, hi)))
+    return words.capitalize()[:limit]
+
+
+def _ago(params, rng, max_days):
+    return params["until"] - timedelta(seconds=rng.randint(0, max_days * 86400))
+
+
+def _gen_user(params, rng, i):
+    uid = params["base"]["user"] + i
+    created = _ago(params, rng, 900)
+    role = "WRITER" if rng.random() < 0.15 else "READER"
+    return [(uid, f"seed{uid}@example.com", "seed-password", f"Seed {uid}",
+             _sentence(rng, 5, 20, 1000), rng.choice(("Madrid", "Caracas", "Miami", "Bogota", "Lima")),
+             role, True, created, created)]
+
+
+def _gen_tag(params, rng, i):
+    tid = params["base"]["tag"] + i
+    name = f"{rng.choice(_WORDS)}-{tid}"
+    return [(tid, name, name)]
+
+
+def _gen_story(params, rng, i):
+    sid = params["base"]["story"] + i
+    author = params["base"]["user"] + skewed(rng, params["users"])
+    created = _ago(params, rng, 700)
+    roll = rng.random()
+    status = "PUBLISHED" if roll < 0.85 else "DRAFT" if roll < 0.97 else "DELETED"
+    published = created + timedelta(hours=rng.randint(1, 72)) if status == "PUBLISHED" else None
+    deleted = created + timedelta(days=rng.randint(1, 30)) if status == "DELETED" else None
+    category = rng.choice(params["category_ids"]) if rng.random() < 0.9 else None
+    return [(sid, author, _sentence(rng, 2, 6, 200), _sentence(rng, 8, 25, 200),
+             status, published, created, published or created, deleted, category)]
+
+
+def _gen_story_tag(params, rng, i):
+    sid = params["base"]["story"] + i
+    tags = {params["base"]["tag"] + skewed(rng, params["tags"], 2.0) for _ in range(rng.randint(1, 5))}
+    return [(sid, t) for t in sorted(tags)]
+
+
+def _gen_chapter(params, rng, i):
+    sid = params["base"]["story"] + i
+    created = _ago(params, rng, 600)
+    rows = []
+    for n in range(1, chapters_for(params, i) + 1):
+        published = rng.random() < 0.9
+        when = created + timedelta(days=n)
+        rows.append((chapter_id(params, i, n), sid, _sentence(rng, 2, 5, 200), n,
+                     _sentence(rng, 40, 90, 600), "PUBLISHED" if published else "DRAFT",
+                     when if published else None, when, when))
+    return rows
+
+
+def _per_user(params, rng, total):
+    avg = total / max(params["users"], 1)
+    return min(int(rng.expovariate(1 / avg)) if avg else 0, params["users"] - 1)
+
+
+def _gen_follower(params, rng, i):
+    uid = params["base"]["user"] + i
+    targets = set()
+    for _ in range(_per_user(params, rng, params["follows"])):
+        t = params["base"]["user"] + skewed(rng, params["users"])
+        if t != uid:
+            targets.add(t)
+    return [(None, uid, t) for t in sorted(targets)]
+
+
+def _gen_story_view(params, rng, i):
+    uid = params["base"]["user"] + i
+    stories = {skewed(rng, params["stories"], 3.0) for _ in range(_per_user(params, rng, params["views"]))}
+    return [(None, uid, params["base"]["story"] + s, 1 + int(rng.expovariate(0.5)), _ago(params, rng, 365))
+            for s in sorted(stories)]
+
+
+def _gen_comment(params, rng, i):
+    s = skewed(rng, params["stories"], 3.0)
+    chapter = None
+    if rng.random() < 0.5:
+        chapter = chapter_id(params, s, rng.randint(1, chapters_for(params, s)))
+    created = _ago(params, rng, 365)
+    return [(None, params["base"]["user"] + skewed(rng, params["users"], 1.5),
+             params["base"]["story"] + s, chapter, _sentence(rng, 3, 30, 280), created, created)]
+
+
+_GENERATORS = {
+    "user": (_gen_user, "users"),
+    "tag": (_gen_tag, "tags"),
+    "story": (_gen_story, "stories"),
+    "story_tag": (_gen_story_tag, "stories"),
+    "chapter": (_gen_chapter, "stories"),
+    "follower": (_gen_follower, "users"),
+    "story_view": (_gen_story_view, "users"),
+    "comment": (_gen_comment, "comments"),
+}
+
+
+def generate_chunk(task):
+    """Process-pool entry point: returns the rows for one chunk of one table."""
+    table, chunk_no, start, end, params = task
+    rng = random.Random(f"{params['seed']}:{table}:{chunk_no}")
+    gen = _GENERATORS[table][0]
+    rows = []
+    for i in range(start, end):
+        rows.extend(gen(params, rng, i))
+    return rows
+
+
+def _copy_rows(table, columns, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["" if v is None else v.isoformat() if isinstance(v, datetime) else v for v in row])
+    buf.seek(0)
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(f'COPY "{table}" ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buf)
+
+
+class BulkLoader:
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.postgres = db.engine.dialect.name == "postgresql"
+        self.tables = {t.name: t for t in db.metadata.sorted_tables}
+        self.next_id = {}
+
+    def load(self, table, rows):
+        columns = COLUMNS[table]
+        if columns[0] == "id" and rows and rows[0][0] is None:
+            # ids handed out in chunk order, which is deterministic
+            start = self.next_id[table]
+            rows = [(start + n,) + tuple(r[1:]) for n, r in enumerate(rows)]
+            self.next_id[table] = start + len(rows)
+        for i in range(0, len(rows), self.batch_size):
+            batch = rows[i:i + self.batch_size]
+            if self.postgres:
+                _copy_rows(table, columns, batch)
+            else:
+                db.session.execute(insert(self.tables[table]), [dict(zip(columns, r)) for r in batch])
+            db.session.commit()
+
+    def reset_sequences(self):
+        if not self.postgres:
+            return
+        for table in COLUMNS:
+            if COLUMNS[table][0] == "id":
+                db.session.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('\"{table}\"', 'id'), "
+                    f"(SELECT coalesce(max(id), 1) FROM \"{table}\"))"
+                ))
+        db.session.commit()
+
+
+def _next_id(model):
+    return (db.session.scalar(select(func.max(model.id))) or 0) + 1
+
+
+def _ensure_categories():
+    existing = {c.name: c.id for c in Category.query.all()}
+    for name in _CATEGORIES:
+        if name not in existing:
+            cat = Category(name=name, slug=name.lower().replace(" ", "-"))
+            db.session.add(cat)
+            db.session.flush()
+            existing[name] = cat.id
+    db.session.commit()
+    return sorted(existing.values())
+
+
+def seed_database(users, stories, chapters_per_story, tags, follows, views, comments,
+                  seed=42, until=None, workers=None, batch_size=10000, log=print):
+    until = until or datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    params = {
+        "seed": seed,
+        "until": until,
+        "users": users,
+        "stories": stories,
+        "chapters_per_story": max(chapters_per_story, 1),
+        "tags": tags,
+        "follows": follows,
+        "views": views,
+        "comments": comments,
+        "category_ids": _ensure_categories(),
+        "base": {
+            "user": _next_id(User),
+            "tag": _next_id(Tag),
+            "story": _next_id(Story),
+            "chapter": _next_id(Chapter),
+        },
+    }
+    loader = BulkLoader(batch_size)
+    loader.next_id = {"follower": _next_id(Follower), "story_view": _next_id(StoryView), "comment": _next_id(Comment)}
+
+    order = ["user", "tag", "story", "story_tag", "chapter", "follower", "story_view", "comment"]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for table in order:
+            count = params[_GENERATORS[table][1]]
+            tasks = [(table, n, start, min(start + CHUNK, count), params)
+                     for n, start in enumerate(range(0, count, CHUNK))]
+            loaded = 0
+            for rows in pool.map(generate_chunk, tasks):
+                loader.load(table, rows)
+                loaded += len(rows)
+            log(f"{table}: {loaded} rows")
+
+    loader.reset_sequences()
+    recount_story_counters()
+    recount_follow_counters()
+    db.session.commit()
+    log("story and follow counters recomputed")
@@ -0,0 +1,164 @@
+"""
+"Similar stories" neighbors, computed offline by `flask build-similar`.
+
+Every published story becomes one sparse row vector: its tags weighted by
+inverse document frequency, followed by the readers who viewed it weighted by
+log(1 + views). Both halves are L2-normalized and scaled by SIMILAR_VIEW_WEIGHT,
+so one sparse product X @ X.T gives the blend of tag cosine and co-view cosine
+for every pair. Rows are multiplied in chunks across a process pool, each chunk
+keeps its SIMILAR_TOP_K best neighbors, and the result replaces the
+story_similarity table. /api/stories/<id>/similar only reads that table.
+
+Memory: a chunk's similarity block has at most one entry per (row, story that
+shares a feature with it). Chunks are sized from that bound so no block holds
+more than SIMILAR_BLOCK_NNZ entries (about 12 bytes each for data and indices,
+so ~240 MB per worker at the default, plus scipy's temporaries of the same
+order), whatever the tag distribution. Features carried by more than
+SIMILAR_MAX_DF of the stories (and at least SIMILAR_MIN_DF_CAP of them), e.g. a
+tag on most stories or a reader who opens everything, are dropped: they add
+little to the cosine but would make every block dense.
+
+NumPy and SciPy are only needed by the build job, not by the web app; they live
+in the Pipfile's optional "similar" category: `pipenv install --categories "packages similar"`
+(or `pip install -r requirements-similar.txt`).
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import delete, insert, select
+
+from api.models import db, Story, StoryStatus, StoryView, StorySimilarity, story_tag
+
+SIMILAR_TOP_K = int(os.getenv("SIMILAR_TOP_K", 20))
+SIMILAR_VIEW_WEIGHT = float(os.getenv("SIMILAR_VIEW_WEIGHT", 0.5))
+SIMILAR_BLOCK_NNZ = int(os.getenv("SIMILAR_BLOCK_NNZ", 20_000_000))
+SIMILAR_MAX_DF = float(os.getenv("SIMILAR_MAX_DF", 0.1))
+SIMILAR_MIN_DF_CAP = int(os.getenv("SIMILAR_MIN_DF_CAP", 1000))
+CHUNK = 2000  # most rows per chunk, SIMILAR_BLOCK_NNZ may make chunks smaller
+
+_matrix = None  # (X, X.T) in each pool worker, set once by _init_worker
+
+
+def _require_numpy():
+    try:
+        import numpy
+        from scipy import sparse
+    except ImportError:
+        raise RuntimeError('flask build-similar needs numpy and scipy: pipenv install --categories "packages similar"')
+    return numpy, sparse
+
+
+def _normalized(np, sparse, rows, cols, values, shape):
+    m = sparse.csr_matrix((values, (rows, cols)), shape=shape, dtype=np.float32)
+    m.sum_duplicates()
+    norms = np.sqrt(np.asarray(m.multiply(m).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ m
+
+
+def story_matrix(story_ids, view_weight=SIMILAR_VIEW_WEIGHT):
+    """Returns the CSR feature matrix, one row per entry of `story_ids`."""
+    np, sparse = _require_numpy()
+    index = {sid: n for n, sid in enumerate(story_ids)}
+    n = len(story_ids)
+    max_df = max(SIMILAR_MAX_DF * n, SIMILAR_MIN_DF_CAP)
+
+    pairs = [(index[s], t) for s, t in db.session.execute(select(story_tag.c.story_id, story_tag.c.tag_id))
+             if s in index]
+    tag_rows = np.fromiter((p[0] for p in pairs), dtype=np.int64, count=len(pairs))
+    tag_ids, tag_cols = np.unique(np.fromiter((p[1] for p in pairs), dtype=np.int64, count=len(pairs)),
+                                  return_inverse=True)
+    df = np.bincount(tag_cols, minlength=len(tag_ids))
+    idf = np.log((1 + n) / (1 + df)) + 1
+    keep = df[tag_cols] <= max_df
+    tags = _normalized(np, sparse, tag_rows[keep], tag_cols[keep], idf[tag_cols[keep]], (n, len(tag_ids)))
+
+    views = [(index[s], u, c) for s, u, c in db.session.execute(
+        select(StoryView.story_id, StoryView.user_id, StoryView.view_count)) if s in index]
+    view_rows = np.fromiter((v[0] for v in views), dtype=np.int64, count=len(views))
+    readers = np.fromiter((v[1] for v in views), dtype=np.int64, count=len(views))
+    counts = np.fromiter((v[2] for v in views), dtype=np.float32, count=len(views))
+    reader_ids, view_cols = np.unique(readers, return_inverse=True)
+    # readers of a single story cannot link two stories
+    stories_read = np.bincount(view_cols, minlength=len(reader_ids))[view_cols]
+    keep = (stories_read > 1) & (stories_read <= max_df)
+    co_views = _normalized(np, sparse, view_rows[keep], view_cols[keep], np.log1p(counts[keep]),
+                           (n, len(reader_ids)))
+
+    return sparse.hstack([tags * np.sqrt(1 - view_weight), co_views * np.sqrt(view_weight)], format="csr")
+
+
+def _row_ranges(x, xt, block_nnz=SIMILAR_BLOCK_NNZ, max_rows=CHUNK):
+    """Splits the rows into [start, end) ranges whose similarity block has at most `block_nnz` entries."""
+    np, _ = _require_numpy()
+    n = x.shape[0]
+    stories_per_feature = np.diff(xt.indptr)
+    # row r's block row has at most min(n, sum of its features' story counts) entries
+    ones = x.copy()
+    ones.data[:] = 1
+    bound = np.minimum(np.asarray(ones @ stories_per_feature).ravel(), n)
+    ends = np.cumsum(bound)
+    ranges, start = [], 0
+    while start < n:
+        used = ends[start - 1] if start else 0
+        end = int(np.searchsorted(ends, used + block_nnz, side="right"))
+        end = min(max(end, start + 1), start + max_rows, n)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _init_worker(x, xt):
+    global _matrix
+    _matrix = (x, xt)
+
+
+def _top_neighbors(task):
+    """Process-pool entry point: (source row, neighbor row, score, rank) lists for rows [start, end)."""
+    import numpy as np
+    start, end, top_k = task
+    x, xt = _matrix
+    sims = (x[start:end] @ xt).tocsr()
+    out = []
+    for r in range(end - start):
+        lo, hi = sims.indptr[r], sims.indptr[r + 1]
+        cols, scores = sims.indices[lo:hi], sims.data[lo:hi]
+        mask = (cols != start + r) & (scores > 0)
+        cols, scores = cols[mask], scores[mask]
+        if len(cols) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+            cols, scores = cols[best], scores[best]
+        order = np.lexsort((cols, -scores))
+        out.extend((start + r, int(cols[i]), float(scores[i]), rank)
+                   for rank, i in enumerate(order, start=1))
+    return out
+
+
+def build_similar(top_k=SIMILAR_TOP_K, view_weight=SIMILAR_VIEW_WEIGHT, workers=None, batch_size=10000, log=print):
+    """Recomputes story_similarity for every published story; returns the number of rows written."""
+    story_ids = list(db.session.scalars(
+        select(Story.id).where(Story.status == StoryStatus.PUBLISHED).order_by(Story.id)
+    ))
+    x = story_matrix(story_ids, view_weight)
+    xt = x.T.tocsr()
+    log(f"feature matrix: {x.shape[0]} stories x {x.shape[1]} features, {x.nnz} non-zeros")
+
+    tasks = [(start, end, top_k) for start, end in _row_ranges(x, xt)]
+    log(f"{len(tasks)} chunks, at most {SIMILAR_BLOCK_NNZ} similarity entries each")
+    if len(tasks) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_worker, initargs=(x, xt)) as pool:
+            chunks = list(pool.map(_top_neighbors, tasks))
+    else:
+        _init_worker(x, xt)
+        chunks = [_top_neighbors(t) for t in tasks]
+
+    db.session.execute(delete(StorySimilarity))
+    written = 0
+    rows = [{"story_id": story_ids[s], "similar_id": story_ids[o], "score": round(score, 6), "rank": rank}
+            for chunk in chunks for s, o, score, rank in chunk]
+    for i in range(0, len(rows), batch_size):
+        db.session.execute(insert(StorySimilarity), rows[i:i + batch_size])
+        written += len(rows[i:i + batch_size])
+    db.session.commit()
+    return written
@@ -0,0 +1,162 @@
+"""
+Counts the SQL statements issued while a block of code runs.
+
+Routes are pinned to a fixed number of round trips with @query_budget(n) so an
+accidental lazy load (N+1) shows up as soon as it is introduced. An exceeded
+budget is logged as a warning; tests/test_query_budgets.py fails CI on it.
+
+`request_stats` applies the same counter to every request: statement count and
+DB time, JSON serialization time and total handler time go out in a
+Server-Timing header, and statements repeated within one request are logged as
+a likely N+1 in debug mode. The header is sent in debug mode only unless
+SERVER_TIMING=1 (or 0) says otherwise, since it reveals DB timings to clients.
+"""
+import functools
+import logging
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Mapper
+
+logger = logging.getLogger(__name__)
+
+# Active counters of the current thread or asyncio task; a tuple, replaced rather than mutated,
+# so coroutines sharing the event loop thread of the ASGI app never see each other's counters.
+_counters = ContextVar("sqlstats_counters", default=())
+
+# distinct statements remembered per counter for the repeat check; counts stay exact past it
+MAX_TRACKED_STATEMENTS = 200
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.rows = 0  # ORM instances loaded from result rows
+        self.duration = 0.0  # seconds spent waiting on the database
+        self.statements = Counter()  # statement text -> times run, at most MAX_TRACKED_STATEMENTS keys
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counters = _counters.get()
+    for counter in counters:
+        counter.count += 1
+        if statement in counter.statements or len(counter.statements) < MAX_TRACKED_STATEMENTS:
+            counter.statements[statement] += 1
+    if counters and context is not None:
+        context._sqlstats_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _time_statement(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_sqlstats_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    for counter in _counters.get():
+        counter.duration += elapsed
+
+
+@event.listens_for(Mapper, "load")
+def _count_row(target, context):
+    for counter in _counters.get():
+        counter.rows += 1
+
+
+def _start_counter():
+    counter = QueryCounter()
+    _counters.set(_counters.get() + (counter,))
+    return counter
+
+
+def _stop_counter(counter):
+    _counters.set(tuple(c for c in _counters.get() if c is not counter))
+
+
+@contextmanager
+def count_queries():
+    counter = _start_counter()
+    try:
+        yield counter
+    finally:
+        _stop_counter(counter)
+
+
+def query_budget(limit):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with count_queries() as counter:
+                rv = view(*args, **kwargs)
+            if counter.count > limit:
+                logger.warning("%s ran %d SQL statements, budget is %d", view.__name__, counter.count, limit)
+            return rv
+        wrapper.query_budget = limit
+        return wrapper
+    return decorator
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that adds the time spent in dumps() to the current request."""
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            if has_request_context() and "sql_counter" in g:
+                g.serialize_time = g.get("serialize_time", 0.0) + time.perf_counter() - started
+
+
+class RequestStats:
+    def init_app(self, app):
+        timing = os.getenv("SERVER_TIMING")
+        app.config.setdefault("SERVER_TIMING", None if timing is None else timing != "0")  # None: follow app.debug
+        app.config.setdefault("N_PLUS_ONE_THRESHOLD", int(os.getenv("N_PLUS_ONE_THRESHOLD", 3)))
+        app.json_provider_class = TimedJSONProvider
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._before)
+        app.after_request(self._after)
+        app.teardown_request(self._teardown)
+
+    def _before(self):
+        g.request_started = time.perf_counter()
+        g.sql_counter = _start_counter()
+
+    def _after(self, response):
+        counter = g.get("sql_counter")
+        if counter is None:
+            return response
+        handler = time.perf_counter() - g.request_started
+        timing = current_app.config["SERVER_TIMING"]
+        if current_app.debug if timing is None else timing:
+            response.headers["Server-Timing"] = ", ".join((
+                f'db;dur={counter.duration * 1000:.2f};desc="{counter.count} queries"',
+                f"serialization;dur={g.get('serialize_time', 0.0) * 1000:.2f}",
+                f"handler;dur={handler * 1000:.2f}",
+            ))
+        if current_app.debug:
+            self._flag_repeats(counter)
+        return response
+
+    def _teardown(self, exc):
+        counter = g.pop("sql_counter", None)
+        if counter is not None:
+            _stop_counter(counter)
+
+    def _flag_repeats(self, counter):
+        threshold = current_app.config["N_PLUS_ONE_THRESHOLD"]
+        for statement, times in counter.statements.items():
+            if times >= threshold:
+                logger.warning("possible N+1 in %s %s: statement ran %d times: %s",
+                               request.method, request.path, times, " ".join(statement.split())[:300])
+
+
+request_stats = RequestStats()
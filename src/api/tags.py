@@ -0,0 +1,109 @@
+"""
+Tag resolution for story create/update.
+
+A list of free-text tag names is slugified once, matched against existing tags
+with a single IN query, and the missing ones are inserted in one statement
+that ignores rows a concurrent request created first. Resolved slug -> id
+pairs are kept in a process-wide LRU so hot tags never hit the database; when
+a cached id turns out to belong to a tag deleted since, tag_story() evicts it
+and resolves the names once more. Names or slugs longer than the Tag columns
+raise ValueError("tag_too_long") instead of being truncated.
+"""
+import re
+
+from sqlalchemy import delete, func, insert, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, Tag, story_tag
+from api.utils import LRUCache
+
+MAX_TAG_LENGTH = 40  # Tag.name and Tag.slug are String(40)
+
+_slug_ids = LRUCache(maxsize=4096, name="tag_slugs")
+
+
+def slugify(name):
+    s = name.strip().lower().replace(" ", "-")
+    s = re.sub(r"[^a-z0-9-]+", "", s)
+    return re.sub(r"-{2,}", "-", s).strip("-")
+
+
+def _lookup(pairs):
+    slugs = [s for s, _ in pairs]
+    names = [n.lower() for _, n in pairs]
+    rows = db.session.execute(
+        select(Tag.id, Tag.slug, Tag.name).where(or_(Tag.slug.in_(slugs), func.lower(Tag.name).in_(names)))
+    ).all()
+    by_slug = {r.slug: r.id for r in rows}
+    by_name = {r.name.lower(): r.id for r in rows}
+    found = {}
+    for slug, name in pairs:
+        tag_id = by_slug.get(slug) or by_name.get(name.lower())
+        if tag_id is not None:
+            found[slug] = tag_id
+    return found
+
+
+def resolve_tag_ids(raw_names):
+    """Returns tag ids for `raw_names` in input order, creating missing tags."""
+    pairs = {}
+    for raw in raw_names:
+        name = str(raw or "").strip()
+        slug = slugify(name) if name else ""
+        if len(name) > MAX_TAG_LENGTH or len(slug) > MAX_TAG_LENGTH:
+            raise ValueError("tag_too_long")
+        if slug and slug not in pairs:
+            pairs[slug] = name
+
+    ids = {}
+    for slug in pairs:
+        tag_id = _slug_ids.get(slug)
+        if tag_id is not None:
+            ids[slug] = tag_id
+
+    missing = [(s, n) for s, n in pairs.items() if s not in ids]
+    if missing:
+        ids.update(_lookup(missing))
+        missing = [(s, n) for s, n in missing if s not in ids]
+    if missing:
+        dialect_insert = postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert
+        db.session.execute(
+            dialect_insert(Tag.__table__)
+            .values([{"name": n, "slug": s} for s, n in missing])
+            .on_conflict_do_nothing()
+        )
+        ids.update(_lookup(missing))
+
+    for slug, tag_id in ids.items():
+        _slug_ids.set(slug, tag_id)
+    return [ids[s] for s in pairs if s in ids]
+
+
+def set_story_tags(story, tag_ids):
+    """
+    Replaces the story's tag links with two statements; `story.tags` is expired, not rewritten.
+    Only ids of existing tags are linked; returns the set of ids that were not.
+    """
+    db.session.execute(delete(story_tag).where(story_tag.c.story_id == story.id))
+    missing = set()
+    if tag_ids:
+        linked = db.session.scalars(
+            insert(story_tag)
+            .from_select(["story_id", "tag_id"], select(literal(story.id), Tag.id).where(Tag.id.in_(tag_ids)))
+            .returning(story_tag.c.tag_id)
+        ).all()
+        missing = set(tag_ids) - set(linked)
+    db.session.expire(story, ["tags"])
+    return missing
+
+
+def tag_story(story, raw_names):
+    """Resolves `raw_names` and links them to the story, flushing a new story first for its id."""
+    tag_ids = resolve_tag_ids(raw_names)
+    if story.id is None:
+        db.session.flush()
+    stale = set_story_tags(story, tag_ids)
+    if stale:
+        # cached ids of tags deleted since: forget them and look the names up again
+        _slug_ids.evict(lambda tag_id: tag_id in stale)
+        set_story_tags(story, resolve_tag_ids(raw_names))
@@ -0,0 +1,119 @@
+"""
+Timestamp formatting shared by every serialize() method.
+
+One TimeFormatter is built per response so all rows of a result set are
+humanized against the same "now". ISO strings are memoized per datetime and
+humanized labels are cached per (locale, timeframe, count), which is exactly
+what arrow's humanize() output depends on, so the strings stay identical to
+calling arrow directly.
+"""
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import arrow
+
+from api.utils import LRUCache
+
+_SECS_PER_MINUTE = 60
+_SECS_PER_HOUR = 60 * 60
+_SECS_PER_DAY = 60 * 60 * 24
+_SECS_PER_WEEK = 60 * 60 * 24 * 7
+_SECS_PER_MONTH = 60 * 60 * 24 * 30.5
+_SECS_PER_YEAR = 60 * 60 * 24 * 365
+
+_human_labels = LRUCache(maxsize=2048, name="human_labels")
+
+
+@lru_cache(maxsize=8192)
+def iso(dt):
+    if not dt:
+        return None
+    u = dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+    return f"{u.year:04d}-{u.month:02d}-{u.day:02d}T{u.hour:02d}:{u.minute:02d}:{u.second:02d}Z"
+
+
+def _age_bucket(dt, now):
+    # Mirrors the "auto" granularity branches of arrow.Arrow.humanize().
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    now = now.astimezone(dt.tzinfo)
+    delta = int(round((dt - now).total_seconds()))
+    sign = -1 if delta < 0 else 1
+    diff = abs(delta)
+
+    if diff < 10:
+        return ("now", 0)
+    if diff < _SECS_PER_MINUTE:
+        return ("seconds", sign * diff)
+    if diff < _SECS_PER_MINUTE * 2:
+        return ("minute", sign)
+    if diff < _SECS_PER_HOUR:
+        return ("minutes", sign * max(diff // _SECS_PER_MINUTE, 2))
+    if diff < _SECS_PER_HOUR * 2:
+        return ("hour", sign)
+    if diff < _SECS_PER_DAY:
+        return ("hours", sign * max(diff // _SECS_PER_HOUR, 2))
+    if diff < _SECS_PER_DAY * 2:
+        return ("day", sign)
+    if diff < _SECS_PER_WEEK:
+        return ("days", sign * max(diff // _SECS_PER_DAY, 2))
+    if diff < _SECS_PER_WEEK * 2:
+        return ("week", sign)
+    if diff < _SECS_PER_MONTH:
+        return ("weeks", sign * max(diff // _SECS_PER_WEEK, 2))
+    if diff < _SECS_PER_MONTH * 2:
+        return ("month", sign)
+    if diff < _SECS_PER_YEAR:
+        months = abs((now.year * 12 + now.month) - (dt.year * 12 + dt.month))
+        return ("months", sign * max(months, 2))
+    if diff < _SECS_PER_YEAR * 2:
+        return ("year", sign)
+    return ("years", sign * max(diff // _SECS_PER_YEAR, 2))
+
+
+def human(dt, locale='en', now=None):
+    if not dt:
+        return None
+    now = now or datetime.now(timezone.utc)
+    key = (locale,) + _age_bucket(dt, now)
+    label = _human_labels.get(key)
+    if label is None:
+        label = arrow.get(dt).humanize(now, locale=locale)
+        _human_labels.set(key, label)
+    return label
+
+
+class TimeFormatter:
+    def __init__(self, locale='en', human=True, now=None):
+        self.locale = locale
+        self.human_enabled = human
+        self.now = now or datetime.now(timezone.utc)
+
+    def iso(self, dt):
+        return iso(dt)
+
+    def human(self, dt):
+        return human(dt, self.locale, self.now)
+
+    def humans(self, **stamps):
+        """Returns the ``<name>_human`` keys for a serialize() dict, or none when disabled."""
+        if not self.human_enabled:
+            return {}
+        return {f"{name}_human": self.human(dt) for name, dt in stamps.items()}
+
+
+def pick_locale(request):
+    loc = (request.args.get("locale") or "").strip()
+    if not loc:
+        al = (request.headers.get("Accept-Language") or "").split(",")[0]
+        loc = (al or "en").split("-")[0].strip().lower() or "en"
+    else:
+        loc = loc.split("-")[0].strip().lower()
+    return loc or "en"
+
+
+def request_formatter(request):
+    """TimeFormatter for the current request's ?locale= / Accept-Language and ?human=."""
+    # ?human=0 drops every *_human field so clients that format dates themselves skip humanize entirely
+    human = (request.args.get("human") or "").strip().lower() not in ("0", "false", "no")
+    return TimeFormatter(locale=pick_locale(request), human=human)
@@ -0,0 +1,128 @@
+"""
+Trending score for /api/stories?sort=trending, kept in story_trending.
+
+Each view counts 1 and each comment TRENDING_COMMENT_WEIGHT, and an event
+loses half its weight every TRENDING_HALF_LIFE_HOURS. Scores are stored as
+ln(sum of weight * 2 ** (hours since EPOCH / half-life)). Every stored score
+would decay by the same factor over time, so the ranking only changes when
+new activity arrives. A run therefore touches only the stories whose
+views_count or comments_count moved since the last run. It folds the new
+activity in at the current time with a log-add, and the column stays
+directly orderable by the (score, story_id) index.
+
+`flask recompute-trending` is meant to run every few minutes. A story seen
+for the first time is seeded from story_view.last_viewed_at and
+comment.created_at within the last TRENDING_WINDOW_DAYS. Older activity
+counts as if it happened at the window's start. Changing the half-life or
+the weights needs a `--rebuild`.
+"""
+import math
+import os
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from api.models import db, Story, StoryStatus, StoryTrending, StoryView, Comment
+
+EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 24))
+TRENDING_COMMENT_WEIGHT = float(os.getenv("TRENDING_COMMENT_WEIGHT", 3))
+TRENDING_WINDOW_DAYS = float(os.getenv("TRENDING_WINDOW_DAYS", 14))
+
+_SEED_CHUNK = 500
+
+
+def log_weight(weight, when):
+    """ln(weight * 2 ** (hours since EPOCH / half-life))."""
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)  # SQLite hands back naive UTC
+    hours = (when - EPOCH).total_seconds() / 3600
+    return math.log(weight) + hours / TRENDING_HALF_LIFE_HOURS * math.log(2)
+
+
+def log_add(a, b):
+    if a is None:
+        return b
+    hi, lo = max(a, b), min(a, b)
+    return hi + math.log1p(math.exp(lo - hi))
+
+
+def _seed_scores(rows, now):
+    """Scores for stories without a story_trending row, from timestamped activity in the window."""
+    cutoff = now - timedelta(days=TRENDING_WINDOW_DAYS)
+    scores, windowed = {}, {}
+    ids = [r.id for r in rows]
+    for i in range(0, len(ids), _SEED_CHUNK):
+        chunk = ids[i:i + _SEED_CHUNK]
+        views = db.session.execute(
+            select(StoryView.story_id, StoryView.last_viewed_at, StoryView.view_count)
+            .where(StoryView.story_id.in_(chunk), StoryView.last_viewed_at >= cutoff)
+        )
+        for story_id, when, count in views:
+            scores[story_id] = log_add(scores.get(story_id), log_weight(count, when))
+            windowed[story_id] = windowed.get(story_id, 0) + count
+        comments = db.session.execute(
+            select(Comment.story_id, Comment.created_at)
+            .where(Comment.story_id.in_(chunk), Comment.created_at >= cutoff, Comment.deleted_at.is_(None))
+        )
+        for story_id, when in comments:
+            scores[story_id] = log_add(scores.get(story_id), log_weight(TRENDING_COMMENT_WEIGHT, when))
+            windowed[story_id] = windowed.get(story_id, 0) + TRENDING_COMMENT_WEIGHT
+
+    for r in rows:
+        older = r.views_count + TRENDING_COMMENT_WEIGHT * r.comments_count - windowed.get(r.id, 0)
+        if older > 0:
+            scores[r.id] = log_add(scores.get(r.id), log_weight(older, cutoff))
+    return scores
+
+
+def recompute_trending(now=None, rebuild=False, batch_size=1000):
+    """Folds activity since the last run into story_trending; returns (rows written, rows removed)."""
+    now = now or datetime.now(timezone.utc)
+    if rebuild:
+        db.session.execute(delete(StoryTrending))
+    removed = db.session.execute(
+        delete(StoryTrending).where(StoryTrending.story_id.in_(
+            select(Story.id).where(Story.status != StoryStatus.PUBLISHED)
+        ))
+    ).rowcount
+
+    changed = db.session.execute(
+        select(Story.id, Story.views_count, Story.comments_count,
+               StoryTrending.score, StoryTrending.views_seen, StoryTrending.comments_seen)
+        .outerjoin(StoryTrending, StoryTrending.story_id == Story.id)
+        .where(
+            Story.status == StoryStatus.PUBLISHED,
+            or_(
+                and_(StoryTrending.story_id.is_(None), or_(Story.views_count > 0, Story.comments_count > 0)),
+                Story.views_count != StoryTrending.views_seen,
+                Story.comments_count != StoryTrending.comments_seen,
+            ),
+        )
+    ).all()
+
+    seeded = _seed_scores([r for r in changed if r.score is None], now)
+    values = []
+    for r in changed:
+        if r.score is None:
+            score = seeded.get(r.id)
+        else:
+            # deleted comments lower comments_count; they are not taken back out of the score
+            weight = (max(r.views_count - r.views_seen, 0)
+                      + TRENDING_COMMENT_WEIGHT * max(r.comments_count - r.comments_seen, 0))
+            score = log_add(r.score, log_weight(weight, now)) if weight > 0 else r.score
+        if score is None:
+            continue
+        values.append({"story_id": r.id, "score": score, "views_seen": r.views_count,
+                       "comments_seen": r.comments_count, "updated_at": now})
+
+    dialect_insert = postgresql.insert if db.engine.dialect.name == "postgresql" else sqlite.insert
+    for i in range(0, len(values), batch_size):
+        stmt = dialect_insert(StoryTrending.__table__).values(values[i:i + batch_size])
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=["story_id"],
+            set_={c: stmt.excluded[c] for c in ("score", "views_seen", "comments_seen", "updated_at")},
+        ))
+    db.session.commit()
+    return len(values), removed
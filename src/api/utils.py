@@ -1,3 +1,6 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
 from flask import jsonify, url_for
 
 class APIException(Exception):
@@ -15,6 +18,68 @@ class APIException(Exception):
         rv['message'] = self.message
         return rv
 
+NAMED_CACHES = {}
+
+
+class LRUCache:
+    """Small thread-safe mapping that evicts the least recently used key once full.
+
+    With a ``ttl`` (seconds) entries also expire and are dropped on read. Caches
+    given a ``name`` are listed in NAMED_CACHES so their hit ratio is exported.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, name=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        if name is not None:
+            NAMED_CACHES[name] = self
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def evict(self, predicate):
+        """Drop every entry whose cached value matches predicate(value)."""
+        with self._lock:
+            for key in [k for k, (_, value) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
 def has_no_empty_params(rule):
     defaults = rule.defaults if rule.defaults is not None else ()
     arguments = rule.arguments if rule.arguments is not None else ()
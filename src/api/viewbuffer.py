@@ -0,0 +1,241 @@
+"""
+Write-behind ingestion for POST /stories/<id>/view.
+
+Views are appended to a per-worker log file (VIEW_LOG_DIR/views-<pid>.log) and
+acknowledged without touching the database. A background thread in each
+worker periodically seals its log into a `.batch` file and folds every pending
+batch into story_view with one multi-row upsert on (user_id, story_id), plus
+the matching Story.views_count bumps, in a single transaction.
+
+Each batch name is recorded in story_view_batch within that transaction, so a
+batch replayed after a crash (or picked up by two workers at once) is applied
+exactly once. Names older than VIEW_BATCH_RETENTION_HOURS are pruned in the
+same transaction; a batch file is removed right after its commit, so only a
+crash in between leaves one to replay. Logs left behind by dead workers are
+sealed and flushed by the next worker that runs a flush, or by
+`flask flush-views`.
+
+The endpoint checks that the story exists before queueing a view, through
+story_exists(), which remembers known ids so repeated views stay off the
+database; views of a story deleted in the meantime are dropped by the flush.
+"""
+import atexit
+import glob
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, delete, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from api.models import db, Story, StoryView, StoryViewBatch, User
+from api.utils import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_UPSERT_CHUNK = 500
+
+_known_stories = LRUCache(maxsize=20000, ttl=300, name="view_story_ids")
+
+
+def story_exists(story_id):
+    """Primary-key check for POST /stories/<id>/view, cached per process for known ids."""
+    if _known_stories.get(story_id):
+        return True
+    found = db.session.scalar(select(Story.id).where(Story.id == story_id)) is not None
+    if found:
+        _known_stories.set(story_id, True)
+    return found
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ViewBuffer:
+    def __init__(self, app=None):
+        self.app = None
+        self._lock = threading.Lock()
+        self._log = None
+        self._pid = None
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault(
+            "VIEW_LOG_DIR",
+            os.getenv("VIEW_LOG_DIR") or os.path.join(tempfile.gettempdir(), "dreamers-views"),
+        )
+        app.config.setdefault("VIEW_FLUSH_INTERVAL", float(os.getenv("VIEW_FLUSH_INTERVAL", 5)))
+        app.config.setdefault("VIEW_BATCH_RETENTION_HOURS", float(os.getenv("VIEW_BATCH_RETENTION_HOURS", 24)))
+        self.app = app
+        atexit.register(self._flush_at_exit)
+
+    @property
+    def log_dir(self):
+        return self.app.config["VIEW_LOG_DIR"]
+
+    def _log_path(self):
+        return os.path.join(self.log_dir, f"views-{os.getpid()}.log")
+
+    def record(self, user_id, story_id):
+        line = f"{int(user_id)} {int(story_id)} {time.time():.6f}\n"
+        with self._lock:
+            if self._pid != os.getpid():
+                # first view in this (possibly freshly forked) worker
+                self._pid = os.getpid()
+                self._log = None
+                self._thread = None
+            if self._log is None:
+                os.makedirs(self.log_dir, exist_ok=True)
+                self._log = open(self._log_path(), "a", buffering=1)
+            self._log.write(line)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="view-flusher", daemon=True)
+                self._thread.start()
+
+    def _seal(self, log_path):
+        try:
+            os.rename(log_path, f"{log_path[:-len('.log')]}-{time.time_ns()}.batch")
+        except FileNotFoundError:
+            pass
+
+    def _rotate(self):
+        with self._lock:
+            if self._log is not None and self._pid == os.getpid():
+                self._log.close()
+                self._log = None
+                self._seal(self._log_path())
+        for path in glob.glob(os.path.join(self.log_dir, "views-*.log")):
+            try:
+                pid = int(os.path.basename(path)[len("views-"):-len(".log")])
+            except ValueError:
+                continue
+            if pid != os.getpid() and not _pid_alive(pid):
+                self._seal(path)
+
+    def flush(self):
+        """Applies every pending batch; returns the number of views written."""
+        if not os.path.isdir(self.log_dir):
+            return 0
+        self._rotate()
+        applied = 0
+        for path in sorted(glob.glob(os.path.join(self.log_dir, "*.batch"))):
+            applied += self._apply(path)
+        return applied
+
+    def _apply(self, path):
+        try:
+            with open(path) as fh:
+                lines = fh.read().splitlines()
+        except FileNotFoundError:
+            return 0  # another worker already applied it
+
+        counts = {}
+        for line in lines:
+            try:
+                user_id, story_id, ts = line.split()
+                key, ts = (int(user_id), int(story_id)), float(ts)
+            except ValueError:
+                continue  # torn last line of a worker that died mid-write
+            n, last = counts.get(key, (0, 0.0))
+            counts[key] = (n + 1, max(last, ts))
+
+        try:
+            db.session.add(StoryViewBatch(id=os.path.basename(path)))
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            _remove(path)
+            return 0
+
+        applied = self._upsert(counts) if counts else 0
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=self.app.config["VIEW_BATCH_RETENTION_HOURS"])
+        db.session.execute(delete(StoryViewBatch).where(StoryViewBatch.applied_at < cutoff))
+        db.session.commit()
+        _remove(path)
+        return applied
+
+    def _upsert(self, counts):
+        story_ids = {s for _, s in counts}
+        user_ids = {u for u, _ in counts}
+        live_stories = set(db.session.scalars(select(Story.id).where(Story.id.in_(story_ids))))
+        live_users = set(db.session.scalars(select(User.id).where(User.id.in_(user_ids))))
+
+        rows = []
+        per_story = {}
+        for (user_id, story_id), (n, ts) in counts.items():
+            if user_id not in live_users or story_id not in live_stories:
+                continue
+            rows.append({
+                "user_id": user_id,
+                "story_id": story_id,
+                "view_count": n,
+                "last_viewed_at": datetime.fromtimestamp(ts, timezone.utc),
+            })
+            per_story[story_id] = per_story.get(story_id, 0) + n
+        if not rows:
+            return 0
+
+        postgres = db.engine.dialect.name == "postgresql"
+        insert = postgresql.insert if postgres else sqlite.insert
+        latest = func.greatest if postgres else func.max
+        sv = StoryView.__table__
+        for i in range(0, len(rows), _UPSERT_CHUNK):
+            stmt = insert(sv).values(rows[i:i + _UPSERT_CHUNK])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["user_id", "story_id"],
+                set_={
+                    "view_count": sv.c.view_count + stmt.excluded.view_count,
+                    "last_viewed_at": latest(sv.c.last_viewed_at, stmt.excluded.last_viewed_at),
+                },
+            )
+            db.session.execute(stmt)
+
+        st = Story.__table__
+        db.session.execute(
+            update(st)
+            .where(st.c.id == bindparam("b_story_id"))
+            .values(views_count=st.c.views_count + bindparam("b_views"), updated_at=st.c.updated_at),
+            [{"b_story_id": sid, "b_views": n} for sid, n in per_story.items()],
+        )
+        return sum(per_story.values())
+
+    def _run(self):
+        while True:
+            time.sleep(self.app.config["VIEW_FLUSH_INTERVAL"])
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                logger.exception("view flush failed, batches stay on disk for the next run")
+
+    def _flush_at_exit(self):
+        if self._pid != os.getpid():
+            return
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception:
+            logger.exception("view flush at exit failed")
+
+
+view_buffer = ViewBuffer()
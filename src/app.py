@@ -2,7 +2,7 @@
 This module takes care of starting the API Server, Loading the DB and Adding the endpoints
 """
 import os
-from flask import Flask, request, jsonify, url_for, send_from_directory
+from flask import Flask, request, jsonify, url_for
 from flask_migrate import Migrate
 from flask_swagger import swagger
 from api.utils import APIException, generate_sitemap
@@ -10,7 +10,13 @@ from api.models import db
 from api.routes import api
 from api.admin import setup_admin
 from api.commands import setup_commands
-from flask_jwt_extended import JWTManager
+from api.viewbuffer import view_buffer
+from api.cache import result_cache
+from api.sqlstats import request_stats
+from api.metrics import metrics
+from api.replicas import replicas, engine_options_from_env
+from api.identity import CachingJWTManager
+from api.assets import AssetManifest
 
 # from models import Person
 
@@ -19,10 +25,11 @@ static_file_dir = os.path.join(os.path.dirname(
     os.path.realpath(__file__)), '../dist/')
 app = Flask(__name__)
 app.url_map.strict_slashes = False
+assets = AssetManifest(static_file_dir)
 
 app.config["JWT_SECRET_KEY"] = "DREAMERSGAVILAN99"
 
-jwt = JWTManager(app)
+jwt = CachingJWTManager(app)
 
 # database condiguration
 db_url = os.getenv("DATABASE_URL")
@@ -33,7 +40,15 @@ else:
     app.config['SQLALCHEMY_DATABASE_URI'] = "sqlite:////tmp/test.db"
 
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# pool sizing, pre-ping and statement timeout, see api/replicas.py
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(
+    {"pool_pre_ping": True}, **engine_options_from_env(app.config['SQLALCHEMY_DATABASE_URI']))
 MIGRATE = Migrate(app, db, compare_type=True)
+
+# prometheus metrics on /internal/metrics; sets the pool class, so it goes before db.init_app
+metrics.init_app(app)
+# optional read replicas (DATABASE_REPLICA_URLS), added as binds before db.init_app
+replicas.init_app(app)
 db.init_app(app)
 
 # add the admin
@@ -42,6 +57,15 @@ setup_admin(app)
 # add the admin
 setup_commands(app)
 
+# buffer story views and flush them in batches
+view_buffer.init_app(app)
+
+# cache hot listing responses, invalidated by version stamps on every write
+result_cache.init_app(app)
+
+# per-request SQL count/time, sent as a Server-Timing header in debug or with SERVER_TIMING=1
+request_stats.init_app(app)
+
 # Add all endpoints form the API with a "api" prefix
 app.register_blueprint(api, url_prefix='/api')
 
@@ -59,16 +83,12 @@ def handle_invalid_usage(error):
 def sitemap():
     if ENV == "development":
         return generate_sitemap(app)
-    return send_from_directory(static_file_dir, 'index.html')
+    return assets.serve('index.html')
 
-# any other endpoint will try to serve it like a static file
+# any other endpoint will try to serve it like a static file, from the manifest built at startup
 @app.route('/<path:path>', methods=['GET'])
 def serve_any_other_file(path):
-    if not os.path.isfile(os.path.join(static_file_dir, path)):
-        path = 'index.html'
-    response = send_from_directory(static_file_dir, path)
-    response.cache_control.max_age = 0  # avoid cache memory
-    return response
+    return assets.serve(path)
 
 
 # this only runs if `$ python src/main.py` is executed
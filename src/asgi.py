@@ -0,0 +1,9 @@
+# ASGI entry point: the public read endpoints run on the async engine, everything
+# else is passed to the Flask app. Run it with e.g.
+#   uvicorn asgi:application --app-dir src --workers 4
+# or under gunicorn with `-k uvicorn.workers.UvicornWorker`.
+
+from app import app
+from api.asyncapp import AsyncReadApp
+
+application = AsyncReadApp(app)
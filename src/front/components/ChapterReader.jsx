@@ -71,8 +71,28 @@ export const ChapterReader = () => {
         const sorted = [...activeOnly].sort((a, b) => (a.number ?? 0) - (b.number ?? 0));
         setChapters(sorted);
 
-        const found = sorted.find(ch => Number(ch.id) === chapId);
-        setChapter(found || null);
+        // the list is a table of contents without chapter text; the body comes from the chapter endpoint
+        const token = localStorage.getItem("token");
+        const chResp = await fetch(`${API_BASE}/api/stories/${storyId}/chapters/${chapId}`, {
+          headers: {
+            Accept: "application/json",
+            ...(token ? { Authorization: `Bearer ${token}` } : {}),
+          },
+        });
+        if (chResp.status === 404) {
+          setChapter(null);
+          return;
+        }
+        const chCt = chResp.headers.get("content-type") || "";
+        if (!chResp.ok) {
+          const text = await chResp.text().catch(() => "");
+          throw new Error(`HTTP ${chResp.status} — ${text.slice(0, 160)}`);
+        }
+        if (!chCt.includes("application/json")) {
+          const text = await chResp.text().catch(() => "");
+          throw new Error(`Non JSON response (${chCt}). Start: ${text.slice(0, 160)}`);
+        }
+        setChapter(await chResp.json());
       } catch (e) {
         setErr(String(e.message || e));
       } finally {
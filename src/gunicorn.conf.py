@@ -0,0 +1,20 @@
+# Picked up automatically by `gunicorn wsgi --chdir ./src/` (see Procfile): gunicorn reads
+# gunicorn.conf.py from the directory it changed into.
+import os
+import shutil
+
+# Multi-worker metrics (api/metrics.py). Set here, before any worker imports prometheus_client,
+# so only gunicorn processes use the shared directory; flask CLI, the dev server and uvicorn keep
+# their values in memory.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/dreamers-metrics")
+
+
+def on_starting(server):
+    # values from a previous run must not be added to the new one
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
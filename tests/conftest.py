@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+_db_dir = tempfile.mkdtemp(prefix="dreamers-test-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from app import app as flask_app  # noqa: E402
+from api.cache import result_cache  # noqa: E402
+from api.models import db  # noqa: E402
+
+# more than the page sizes the tests compare, so every page is full
+SEEDED_STORIES = 25
+
+
+@pytest.fixture(scope="session")
+def app():
+    with flask_app.app_context():
+        db.create_all()
+    yield flask_app
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    return app.test_client()
+
+
+def ok(response):
+    assert response.status_code < 400, response.get_data(as_text=True)
+    return response.get_json()
+
+
+@pytest.fixture
+def uncached():
+    """Bypasses the response cache so every request runs its view."""
+    backend, result_cache.backend = result_cache.backend, None
+    yield
+    result_cache.backend = backend
+
+
+@pytest.fixture(scope="session")
+def make_user(client):
+    """Registers a user and returns (user id, auth headers)."""
+    def make(name):
+        email = f"{name.lower()}@example.com"
+        user = ok(client.post("/api/auth/register", json={"email": email, "password": "x", "display_name": name}))
+        token = ok(client.post("/api/auth/login", json={"email": email, "password": "x"}))["access_token"]
+        return user["id"], {"Authorization": "Bearer " + token}
+    return make
+
+
+@pytest.fixture(scope="session")
+def seeded(client, make_user):
+    """An author with SEEDED_STORIES published stories, each with tags, chapters and comments."""
+    _, author = make_user("Author")
+    _, reader = make_user("Reader")
+    category = ok(client.post("/api/categories", json={"name": "Fantasy"}, headers=author))
+
+    story_ids = []
+    for i in range(SEEDED_STORIES):
+        story = ok(client.post("/api/stories", json={
+            "title": f"Story {i}", "synopsis": "dragons", "category_id": category["id"], "tags": ["epic", f"tag {i}"],
+        }, headers=author))
+        ok(client.patch(f"/api/stories/{story['id']}", json={"status": "PUBLISHED"}, headers=author))
+        for n in range(1, 4):
+            chapter = ok(client.post(f"/api/stories/{story['id']}/chapters", json={
+                "title": f"Chapter {n}", "number": n, "content": "text", "status": "PUBLISHED",
+            }, headers=author))
+            ok(client.post(f"/api/stories/{story['id']}/chapters/{chapter['id']}/comments", json={"text": "nice"}, headers=reader))
+        ok(client.post("/api/comments", json={"story_id": story["id"], "text": "great"}, headers=reader))
+        story_ids.append(story["id"])
+    return story_ids
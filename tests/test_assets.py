@@ -0,0 +1,26 @@
+import pytest
+
+from api.assets import IMMUTABLE, SHORT, AssetManifest
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    (tmp_path / "assets").mkdir()
+    for name in ("index-B2x-9kQa.js", "index-Dq_4kR7a.css", "vendor.a1B2c3D4.js", "logo.svg"):
+        (tmp_path / "assets" / name).write_text("x")
+    (tmp_path / "robots.txt").write_text("x")
+    (tmp_path / "index.html").write_text("<html></html>")
+    return AssetManifest(str(tmp_path))
+
+
+@pytest.mark.parametrize("rel, cache_control", [
+    ("assets/index-B2x-9kQa.js", IMMUTABLE),
+    ("assets/index-Dq_4kR7a.css", IMMUTABLE),
+    ("assets/vendor.a1B2c3D4.js", IMMUTABLE),
+    ("assets/logo.svg", SHORT),
+    ("robots.txt", SHORT),
+])
+def test_cache_control(app, manifest, rel, cache_control):
+    with app.test_request_context(f"/{rel}"):
+        response = manifest.serve(rel)
+    assert response.headers["Cache-Control"] == cache_control
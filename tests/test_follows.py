@@ -0,0 +1,17 @@
+from conftest import ok
+
+
+def _feed_story_ids(client, headers):
+    return [item["story"]["id"] for item in ok(client.get("/api/user/me/feed", headers=headers))["items"]]
+
+
+def test_unfollow_removes_author_from_feed(client, make_user):
+    author_id, author = make_user("FeedAuthor")
+    _, reader = make_user("FeedReader")
+    ok(client.post("/api/follows", json={"following_id": author_id}, headers=reader))
+    story = ok(client.post("/api/stories", json={"title": "Followed story"}, headers=author))
+    ok(client.patch(f"/api/stories/{story['id']}", json={"status": "PUBLISHED"}, headers=author))
+    assert _feed_story_ids(client, reader) == [story["id"]]
+
+    assert client.delete(f"/api/follows?following_id={author_id}", headers=reader).status_code == 204
+    assert _feed_story_ids(client, reader) == []
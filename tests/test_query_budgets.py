@@ -0,0 +1,100 @@
+"""
+The hot routes stay within their @query_budget: an exceeded budget is only
+logged at runtime, so these tests turn that warning into a failure. Listings
+must also run the same number of statements whatever the page size.
+"""
+import logging
+
+import pytest
+
+from api.sqlstats import count_queries
+from conftest import ok
+
+
+def _budget_warnings(caplog):
+    return [r.getMessage() for r in caplog.records if r.name == "api.sqlstats" and "budget is" in r.getMessage()]
+
+
+@pytest.mark.parametrize("endpoint", [
+    "api.list_stories", "api.get_story", "api.list_chapters", "api.create_story", "api.update_story",
+])
+def test_route_declares_a_budget(app, endpoint):
+    assert isinstance(getattr(app.view_functions[endpoint], "query_budget", None), int)
+
+
+@pytest.mark.parametrize("query", [
+    "",
+    "?per_page=5",
+    "?tag=epic",
+    "?category_slug=fantasy&total=exact",
+    "?q=drag",
+    "?cursor=&per_page=2",
+    "?fields=id,title,category,tags,comments_count",
+])
+def test_list_stories_within_budget(client, seeded, caplog, query):
+    with caplog.at_level(logging.WARNING, logger="api.sqlstats"):
+        response = client.get(f"/api/stories{query}")
+    assert response.status_code == 200
+    assert not _budget_warnings(caplog)
+
+
+@pytest.mark.parametrize("query", [
+    "?per_page={n}",
+    "?tag=epic&per_page={n}",
+    "?cursor=&per_page={n}",
+    "?fields=id,title,category,tags&cursor=&per_page={n}",
+])
+def test_list_stories_statements_independent_of_page_size(client, seeded, uncached, query):
+    counts = {}
+    for per_page in (5, 10, 20):
+        with count_queries() as counter:
+            response = client.get("/api/stories" + query.format(n=per_page))
+        assert response.status_code == 200
+        items = response.get_json()["items"]
+        assert len(items) == per_page
+        counts[per_page] = counter.count
+    assert len(set(counts.values())) == 1, counts
+
+
+@pytest.mark.parametrize("query", ["", "?fields=id,title,category,tags"])
+def test_get_story_within_budget(client, seeded, caplog, query):
+    with caplog.at_level(logging.WARNING, logger="api.sqlstats"):
+        for story_id in seeded:
+            assert client.get(f"/api/stories/{story_id}{query}").status_code == 200
+    assert not _budget_warnings(caplog)
+
+
+@pytest.mark.parametrize("query", ["", "?fields=id,title,number"])
+def test_list_chapters_within_budget(client, seeded, caplog, query):
+    with caplog.at_level(logging.WARNING, logger="api.sqlstats"):
+        for story_id in seeded:
+            response = client.get(f"/api/stories/{story_id}/chapters{query}")
+            assert response.status_code == 200
+            assert len(response.get_json()) == 3
+    assert not _budget_warnings(caplog)
+
+
+def test_create_story_within_budget(client, make_user, caplog):
+    _, author = make_user("Creator")
+    category = ok(client.post("/api/categories", json={"name": "Budget category"}, headers=author))
+    with caplog.at_level(logging.WARNING, logger="api.sqlstats"):
+        response = client.post("/api/stories", json={
+            "title": "Budgeted", "synopsis": "s", "category_id": category["id"], "tags": ["epic", "brand new tag"],
+        }, headers=author)
+    assert response.status_code == 201
+    assert response.get_json()["category"]["id"] == category["id"]
+    assert not _budget_warnings(caplog)
+
+
+def test_publish_with_followers_within_budget(client, make_user, caplog):
+    author_id, author = make_user("Publisher")
+    for name in ("FollowerOne", "FollowerTwo"):
+        _, follower = make_user(name)
+        assert client.post("/api/follows", json={"following_id": author_id}, headers=follower).status_code == 201
+    story = client.post("/api/stories", json={"title": "Draft"}, headers=author).get_json()
+    with caplog.at_level(logging.WARNING, logger="api.sqlstats"):
+        response = client.patch(f"/api/stories/{story['id']}", json={
+            "status": "PUBLISHED", "tags": [f"publish tag {i}" for i in range(20)],
+        }, headers=author)
+    assert response.status_code == 200
+    assert not _budget_warnings(caplog)